@@ -10,5 +10,11 @@ class Settings(BaseModel):
     CITY_NAME: str = os.getenv("CITY_NAME", "Dhaka")
     CITY_CENTER_LAT: float = float(os.getenv("CITY_CENTER_LAT", "23.8103"))
     CITY_CENTER_LON: float = float(os.getenv("CITY_CENTER_LON", "90.4125"))
+    # minlon,minlat,maxlon,maxlat
+    CITY_BBOX: list[float] = [float(v) for v in os.getenv("CITY_BBOX", "90.20,23.60,90.60,24.00").split(",")]
+    # background build jobs (see app/services/jobs.py)
+    BUILD_WORKERS: int = int(os.getenv("BUILD_WORKERS", "1"))
+    BUILD_QUEUE_MAX: int = int(os.getenv("BUILD_QUEUE_MAX", "4"))
+    BUILD_NICE: int = int(os.getenv("BUILD_NICE", "10"))
 
 settings = Settings()
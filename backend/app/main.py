@@ -6,6 +6,14 @@ from app.routes.stats import router as stats_router
 from app.routes.hotspots import router as hotspots_router
 from app.routes.chat import router as chat_router
 from app.routes.recommend import router as recommend_router
+from app.routes.facilities import router as facilities_router
+from app.routes.score import router as score_router
+from app.routes.aggregate import router as aggregate_router
+from app.routes.scenario import router as scenario_router
+from app.routes.jobs import router as jobs_router
+from app.services.aggregate import WardStore, WARDS_PATH
+from app.services.jobs import JobManager
+from app.services.geo import HexStore, DATA_PATH
 
 app = FastAPI(title="CityPath API", version="0.1")
 
@@ -17,6 +25,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def preload():
+    # load the hex table before the first request
+    if DATA_PATH.exists():
+        HexStore.load()
+    # polyfill ward boundaries up front so ward aggregates answer instantly
+    if WARDS_PATH.exists():
+        WardStore.load()
+
+@app.on_event("shutdown")
+def stop_build_workers():
+    JobManager.shutdown()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -27,4 +48,9 @@ app.include_router(stats_router)
 app.include_router(hotspots_router)
 app.include_router(chat_router)
 app.include_router(grid_router)
-app.include_router(recommend_router)
\ No newline at end of file
+app.include_router(recommend_router)
+app.include_router(facilities_router)
+app.include_router(score_router)
+app.include_router(aggregate_router)
+app.include_router(scenario_router)
+app.include_router(jobs_router)
\ No newline at end of file
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class AggregateRequest(BaseModel):
+    geojson: Optional[Dict[str, Any]] = Field(
+        None, description="Polygon/MultiPolygon geometry, Feature or FeatureCollection"
+    )
+    wards: Optional[List[str]] = Field(None, max_length=500, description="Preloaded ward names")
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+from datetime import date
+
+class BuildRequest(BaseModel):
+    city: Optional[str] = Field(None, description="Defaults to the configured CITY_NAME")
+    bbox: Optional[List[float]] = Field(None, min_length=4, max_length=4, description="minlon, minlat, maxlon, maxlat")
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    res: int = Field(9, ge=5, le=11)
+    rasters: Optional[str] = Field(None, description="Sub-folder of app/data/rasters to build from")
+    priority: int = Field(5, ge=0, le=9, description="Lower runs first")
+    publish: bool = Field(True, description="Serve the result as soon as the build finishes")
+
+    @model_validator(mode="after")
+    def _check(self):
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValueError("start_date is after end_date")
+        if self.bbox:
+            minlon, minlat, maxlon, maxlat = self.bbox
+            if not (minlon < maxlon and minlat < maxlat):
+                raise ValueError("bbox must be minlon, minlat, maxlon, maxlat")
+        return self
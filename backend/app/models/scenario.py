@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class Intervention(BaseModel):
+    hex_id: str
+    ndvi_delta: float = Field(0.3, ge=-2.0, le=2.0)
+
+class CoolingParams(BaseModel):
+    per_ndvi: float = Field(10.0, ge=0.0, le=50.0, description="°C of cooling per +1.0 NDVI in the greened hex")
+    rings: int = Field(1, ge=0, le=5, description="How many H3 rings around it also cool")
+    decay: float = Field(0.5, ge=0.0, le=1.0, description="Cooling multiplier per ring")
+
+class ScenarioRequest(BaseModel):
+    interventions: List[Intervention] = Field(..., max_length=5000)
+    cooling: Optional[CoolingParams] = None
+    parent: Optional[str] = Field(None, description="Build on top of an existing scenario id")
+    limit: int = Field(10, ge=1, le=200)
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Literal, Optional
+
+class ScoreRequest(BaseModel):
+    expression: Optional[str] = Field(None, max_length=500, examples=["heat * 2 + log_pop - ndvi"])
+    weights: Optional[Dict[str, float]] = Field(None, examples=[{"heat": 2, "log_pop": 1, "ndvi": -1}])
+    mode: Literal["top", "column"] = "top"
+    limit: int = Field(10, ge=1, le=500)
+    min_spacing: int = Field(0, ge=0, le=10)
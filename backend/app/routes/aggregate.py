@@ -0,0 +1,34 @@
+# app/routes/aggregate.py
+from fastapi import APIRouter, HTTPException
+from app.models.aggregate import AggregateRequest
+from app.services.aggregate import PolygonTooLarge, WardStore, aggregate_geojson, features_of
+
+router = APIRouter(prefix="/api/aggregate", tags=["aggregate"])
+
+MAX_FEATURES = 500
+
+@router.get("/wards")
+def wards():
+    return {"wards": WardStore.names()}
+
+@router.post("/")
+def aggregate(req: AggregateRequest):
+    if not req.geojson and not req.wards:
+        raise HTTPException(status_code=400, detail="Give 'geojson' and/or 'wards'")
+
+    items = []
+    if req.wards:
+        try:
+            items += WardStore.aggregate(req.wards)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=f"Unknown ward(s): {e.args[0]}")
+    if req.geojson:
+        try:
+            if len(features_of(req.geojson)) > MAX_FEATURES:
+                raise HTTPException(status_code=400, detail=f"At most {MAX_FEATURES} features per call")
+            items += aggregate_geojson(req.geojson)
+        except PolygonTooLarge as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except (ValueError, KeyError, TypeError, IndexError) as e:
+            raise HTTPException(status_code=400, detail=f"Bad geometry: {e}")
+    return {"items": items, "count": len(items)}
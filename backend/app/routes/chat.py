@@ -47,14 +47,14 @@ async def chat(request: Request):
     question = (body.get("question") or "").strip()
     qlow = question.lower()
 
-    # Pick tool + context
+    # Pick tool + context (no two markers within 2 rings, so they cover distinct areas)
     markers = []
     if "park" in qlow or "green" in qlow or "tree" in qlow:
-        markers = suggest_parks(limit=10)
+        markers = suggest_parks(limit=10, min_spacing=2)
         intent = "parks"
         context = "The user wants locations for new parks/trees (hot + bare + populated)."
     elif "clinic" in qlow or "health" in qlow or "hospital" in qlow:
-        markers = suggest_clinics(limit=10)
+        markers = suggest_clinics(limit=10, min_spacing=2)
         intent = "clinics"
         context = "The user wants locations for clinics (hot + populated)."
     else:
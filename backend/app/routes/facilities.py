@@ -0,0 +1,30 @@
+# app/routes/facilities.py
+from fastapi import APIRouter, Body, HTTPException, Query
+from app.services.facilities import FacilityStore, KIND_ALIASES, parse_geojson, normalize_kind
+
+router = APIRouter(prefix="/api/facilities", tags=["facilities"])
+
+@router.get("/")
+def facilities():
+    return {"counts": FacilityStore.summary(), "version": FacilityStore.version()}
+
+@router.post("/")
+def upload_facilities(
+    geojson: dict = Body(..., description="GeoJSON FeatureCollection of facility points"),
+    kind: str | None = Query(None, description="Default kind for features without one"),
+    replace: bool = Query(True, description="Replace existing facilities of the uploaded kinds"),
+):
+    default_kind = None
+    if kind is not None:
+        default_kind = normalize_kind(kind)
+        if default_kind is None:
+            known = sorted(set(KIND_ALIASES.values()))
+            raise HTTPException(status_code=400, detail=f"Unknown kind '{kind}'. Use one of {known}")
+    try:
+        df = parse_geojson(geojson, default_kind=default_kind)
+    except (TypeError, IndexError, ValueError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Bad GeoJSON: {e}")
+    if df.empty:
+        raise HTTPException(status_code=400, detail="No facility points with a known kind")
+    FacilityStore.update(df, replace=replace)
+    return {"added": len(df), "counts": FacilityStore.summary(), "version": FacilityStore.version()}
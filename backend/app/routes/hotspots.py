@@ -1,8 +1,15 @@
 from fastapi import APIRouter, Query
 from app.services.geo import rank_hotspots
+from app.services.neighborhood import NEIGHBORHOOD_THEMES, rank_neighborhood_hotspots
 
 router = APIRouter(prefix="/api/hotspots", tags=["hotspots"])
 
 @router.get("/")
-def hotspots(theme: str = Query("heat"), limit: int = Query(50, ge=1, le=200)):
+def hotspots(
+    theme: str = Query("heat"),
+    limit: int = Query(50, ge=1, le=200),
+    k: int = Query(1, ge=1, le=5, description="Neighbourhood size in H3 rings (*_gi / *_smooth themes)"),
+):
+    if theme in NEIGHBORHOOD_THEMES:
+        return rank_neighborhood_hotspots(theme=theme, limit=limit, k=k)
     return rank_hotspots(theme=theme, limit=limit)
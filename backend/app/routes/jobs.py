@@ -0,0 +1,51 @@
+# app/routes/jobs.py
+from fastapi import APIRouter, HTTPException
+from app.core.config import settings
+from app.models.jobs import BuildRequest
+from app.services.build import RASTERS_DIR, MAX_BUILD_CELLS, estimate_bbox_cells
+from app.services.jobs import BuildParams, JobManager, QueueFull
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+@router.post("/build", status_code=202)
+def build(req: BuildRequest):
+    city = req.city or settings.CITY_NAME
+    same_city = city.lower() == settings.CITY_NAME.lower()
+    if not req.bbox and not same_city:
+        raise HTTPException(status_code=400, detail=f"Give a bbox for {city}")
+    bbox = req.bbox or settings.CITY_BBOX
+    est = estimate_bbox_cells(bbox, req.res)
+    if est > MAX_BUILD_CELLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"bbox covers ~{est} cells at res {req.res}; the limit is {MAX_BUILD_CELLS}",
+        )
+
+    rasters_dir = RASTERS_DIR
+    if req.rasters:
+        rasters_dir = (RASTERS_DIR / req.rasters).resolve()
+        if not rasters_dir.is_relative_to(RASTERS_DIR.resolve()) or not rasters_dir.is_dir():
+            raise HTTPException(status_code=400, detail=f"Unknown rasters folder {req.rasters}")
+
+    params = BuildParams(
+        city=city, bbox=bbox, res=req.res,
+        start=req.start_date, end=req.end_date,
+        rasters_dir=rasters_dir, publish=req.publish,
+    )
+    try:
+        job = JobManager.submit(params, priority=req.priority)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.to_dict()
+
+@router.get("/")
+def jobs():
+    items = [j.to_dict() for j in JobManager.all()]
+    return {"items": items, "count": len(items)}
+
+@router.get("/{job_id}")
+def job(job_id: str):
+    j = JobManager.get(job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return j.to_dict()
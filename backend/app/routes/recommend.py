@@ -5,11 +5,17 @@ from app.services.recommend import suggest_parks, suggest_clinics
 router = APIRouter(prefix="/api/recommend", tags=["recommend"])
 
 @router.get("/parks")
-def recommend_parks(limit: int = Query(10, ge=1, le=200)):
-    items = suggest_parks(limit=limit)
+def recommend_parks(
+    limit: int = Query(10, ge=1, le=200),
+    min_spacing: int = Query(0, ge=0, le=10, description="Skip picks within this many H3 rings of a better pick"),
+):
+    items = suggest_parks(limit=limit, min_spacing=min_spacing)
     return {"items": items, "count": len(items)}
 
 @router.get("/clinics")
-def recommend_clinics(limit: int = Query(10, ge=1, le=200)):
-    items = suggest_clinics(limit=limit)
+def recommend_clinics(
+    limit: int = Query(10, ge=1, le=200),
+    min_spacing: int = Query(0, ge=0, le=10, description="Skip picks within this many H3 rings of a better pick"),
+):
+    items = suggest_clinics(limit=limit, min_spacing=min_spacing)
     return {"items": items, "count": len(items)}
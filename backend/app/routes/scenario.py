@@ -0,0 +1,33 @@
+# app/routes/scenario.py
+from fastapi import APIRouter, HTTPException, Query
+from app.models.scenario import ScenarioRequest
+from app.services.scenario import Cooling, ScenarioStore
+
+router = APIRouter(prefix="/api/scenarios", tags=["scenarios"])
+
+@router.post("/")
+def create_scenario(req: ScenarioRequest):
+    if req.parent and req.cooling:
+        raise HTTPException(status_code=400, detail="A child scenario inherits its parent's cooling")
+    cooling = Cooling(**req.cooling.model_dump()) if req.cooling else None
+    if req.parent and ScenarioStore.get(req.parent) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown parent scenario {req.parent}")
+    s, missing = ScenarioStore.create(
+        [(i.hex_id, i.ndvi_delta) for i in req.interventions],
+        cooling=cooling,
+        parent=req.parent,
+    )
+    return {**s.summary(limit=req.limit), "missing": missing}
+
+@router.get("/{scenario_id}")
+def get_scenario(scenario_id: str, limit: int = Query(10, ge=1, le=200)):
+    s = ScenarioStore.get(scenario_id)
+    if s is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return s.summary(limit=limit)
+
+@router.delete("/{scenario_id}")
+def delete_scenario(scenario_id: str):
+    if not ScenarioStore.delete(scenario_id):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"deleted": scenario_id}
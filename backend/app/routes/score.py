@@ -0,0 +1,22 @@
+# app/routes/score.py
+from fastapi import APIRouter, HTTPException
+from app.models.score import ScoreRequest
+from app.services.scoring import available_columns, resolve_expression, score_column, score_top
+
+router = APIRouter(prefix="/api/score", tags=["score"])
+
+@router.get("/columns")
+def score_columns():
+    # z-scored "<metric>", "log_<metric>" and untransformed "raw_<metric>"
+    return {"columns": available_columns()}
+
+@router.post("/")
+def score(req: ScoreRequest):
+    try:
+        expr = resolve_expression(req.expression, req.weights)
+        if req.mode == "column":
+            return {"expression": expr, **score_column(expr)}
+        items = score_top(expr, limit=req.limit, min_spacing=req.min_spacing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"expression": expr, "items": items, "count": len(items)}
@@ -0,0 +1,222 @@
+# app/services/aggregate.py
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+
+import numpy as np
+from h3 import h3
+
+from app.core.logging import logger
+from .geo import HexStore, HexSnapshot
+
+WARDS_PATH = Path(__file__).resolve().parents[1] / "data" / "wards.geojson"
+
+# Guards against country-sized polygons: at res 9 a cell is ~0.1 km²
+MAX_POLYFILL_CELLS = 200_000     # per geometry
+MAX_REQUEST_CELLS = 1_000_000    # summed over one request
+MAX_CACHED_CELLS = 1_000_000     # PolyfillCache budget (total cells, not entries)
+
+
+def geometry_key(geom: dict) -> str:
+    return hashlib.sha1(json.dumps(geom, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def features_of(gj: dict) -> List[Tuple[dict, dict]]:
+    """
+    GeoJSON FeatureCollection / Feature / bare geometry -> [(properties, geometry)].
+    Raises ValueError on anything that isn't shaped like GeoJSON.
+    """
+    if not isinstance(gj, dict):
+        raise ValueError("Expected a GeoJSON object")
+    t = gj.get("type")
+    if t == "FeatureCollection":
+        feats = gj.get("features", [])
+        if not isinstance(feats, list):
+            raise ValueError("'features' must be a list")
+    elif t == "Feature":
+        feats = [gj]
+    else:
+        return [({}, gj)]
+    out = []
+    for i, f in enumerate(feats):
+        if not isinstance(f, dict) or not isinstance(f.get("geometry"), dict):
+            raise ValueError(f"Feature {i} has no geometry object")
+        props = f.get("properties") or {}
+        if not isinstance(props, dict):
+            raise ValueError(f"Feature {i} properties must be an object")
+        out.append((props, f["geometry"]))
+    return out
+
+
+class PolygonTooLarge(ValueError):
+    pass
+
+
+class PolyfillCache:
+    """geometry hash + resolution -> H3 cells inside it (LRU, bounded by total cells)."""
+    _cells: "OrderedDict[Tuple[str, int], Tuple[str, ...]]" = OrderedDict()
+    _total = 0
+
+    @classmethod
+    def cells(cls, geom: dict, res: int) -> Tuple[str, ...]:
+        key = (geometry_key(geom), res)
+        hit = cls._cells.get(key)
+        if hit is not None:
+            cls._cells.move_to_end(key)
+            return hit
+
+        cells = polyfill(geom, res)
+        cls._cells[key] = cells
+        cls._total += len(cells)
+        while cls._total > MAX_CACHED_CELLS and len(cls._cells) > 1:
+            _, old = cls._cells.popitem(last=False)
+            cls._total -= len(old)
+        return cells
+
+
+def _parts(geom: dict) -> list:
+    t = geom.get("type") if isinstance(geom, dict) else None
+    if t == "Polygon":
+        return [geom["coordinates"]]
+    if t == "MultiPolygon":
+        return geom["coordinates"]
+    raise ValueError(f"Expected Polygon or MultiPolygon geometry, got {t}")
+
+
+def estimate_cells(geom: dict, res: int) -> int:
+    """Upper-bound-ish cell count from the outer rings' lat/lon bboxes (no polyfill)."""
+    cell_km2 = h3.hex_area(res, unit="km^2")
+    total = 0.0
+    for rings in _parts(geom):
+        pts = np.asarray(rings[0], dtype=float)
+        dlon = pts[:, 0].max() - pts[:, 0].min()
+        dlat = pts[:, 1].max() - pts[:, 1].min()
+        mid = np.radians((pts[:, 1].max() + pts[:, 1].min()) / 2)
+        total += (dlat * 111.32) * (dlon * 111.32 * np.cos(mid)) / cell_km2
+    return int(total) + 1
+
+
+def polyfill(geom: dict, res: int) -> Tuple[str, ...]:
+    """
+    H3 cells whose centres fall inside a (Multi)Polygon. Polygons smaller
+    than one cell fall back to the cell under their vertex mean.
+    Raises PolygonTooLarge rather than filling more than MAX_POLYFILL_CELLS.
+    """
+    parts = _parts(geom)
+    est = estimate_cells(geom, res)
+    if est > MAX_POLYFILL_CELLS:
+        raise PolygonTooLarge(
+            f"Polygon covers ~{est} cells at res {res}; the limit is {MAX_POLYFILL_CELLS}"
+        )
+
+    cells = set()
+    for rings in parts:
+        cells |= h3.polyfill({"type": "Polygon", "coordinates": rings}, res, geo_json_conformant=True)
+    if not cells:
+        pts = np.asarray(parts[0][0], dtype=float)
+        cells.add(h3.geo_to_h3(float(pts[:, 1].mean()), float(pts[:, 0].mean()), res))
+    return tuple(sorted(cells))
+
+
+def _round(x, nd):
+    return None if x is None or not np.isfinite(x) else round(float(x), nd)
+
+
+def _weighted_mean(x: np.ndarray, w: np.ndarray) -> Optional[float]:
+    ok = ~np.isnan(x)
+    if not ok.any():
+        return None
+    wsum = w[ok].sum()
+    if wsum <= 0:
+        return float(x[ok].mean())
+    return float((x[ok] * w[ok]).sum() / wsum)
+
+
+def aggregate_cells(cells: Tuple[str, ...], snap: Optional[HexSnapshot] = None) -> Dict:
+    """
+    Population-weighted LST/NDVI means and estimated population over the cells
+    that exist in the hex table.
+    """
+    snap = snap or HexStore.snapshot()
+    df = snap.df
+    pos = HexStore.positions(cells, snap)
+    pos = pos[pos >= 0]
+
+    lst = df["lst_day_mean"].to_numpy(dtype=float)[pos]
+    ndvi = df["ndvi_mean"].to_numpy(dtype=float)[pos]
+    pop = np.nan_to_num(df["pop_density"].to_numpy(dtype=float)[pos])  # persons / km²
+    cell_km2 = h3.hex_area(HexStore.resolution(snap), unit="km^2")
+
+    # area, means and population all over the cells the grid actually covers
+    return {
+        "cells": len(cells),
+        "matched": int(len(pos)),
+        "area_km2": _round(len(pos) * cell_km2, 2),
+        "lst_day_mean": _round(_weighted_mean(lst, pop), 2),
+        "ndvi_mean": _round(_weighted_mean(ndvi, pop), 3),
+        "lst_day_max": _round(np.nanmax(lst), 2) if len(pos) and not np.isnan(lst).all() else None,
+        "pop_density_mean": _round(pop.mean(), 1) if len(pos) else None,
+        "population_est": int(round(pop.sum() * cell_km2)),
+    }
+
+
+def aggregate_geojson(gj: dict) -> List[Dict]:
+    snap = HexStore.snapshot()
+    res = HexStore.resolution(snap)
+    feats = features_of(gj)
+    est = sum(estimate_cells(geom, res) for _, geom in feats)
+    if est > MAX_REQUEST_CELLS:
+        raise PolygonTooLarge(
+            f"Request covers ~{est} cells at res {res}; the limit is {MAX_REQUEST_CELLS}"
+        )
+    out = []
+    for props, geom in feats:
+        item = {"properties": props}
+        item.update(aggregate_cells(PolyfillCache.cells(geom, res), snap))
+        out.append(item)
+    return out
+
+
+def _ward_name(props: dict, i: int) -> str:
+    for k in ("name", "NAME", "ward", "WARD", "ward_name"):
+        if props.get(k) is not None:
+            return str(props[k])
+    return f"ward_{i}"
+
+
+class WardStore:
+    """Ward boundaries from data/wards.geojson, polyfilled once at the dataset resolution."""
+    _cells: Optional[Dict[str, Tuple[str, ...]]] = None
+    _res = None
+
+    @classmethod
+    def load(cls) -> Dict[str, Tuple[str, ...]]:
+        res = HexStore.resolution()
+        if cls._cells is None or cls._res != res:
+            cells = {}
+            if WARDS_PATH.exists():
+                gj = json.loads(WARDS_PATH.read_text())
+                for i, (props, geom) in enumerate(features_of(gj)):
+                    name = _ward_name(props, i)
+                    try:
+                        cells[name] = polyfill(geom, res)  # kept here, not in the LRU
+                    except ValueError as e:
+                        logger.warning("Skipping ward %s: %s", name, e)
+            cls._cells, cls._res = cells, res
+        return cls._cells
+
+    @classmethod
+    def names(cls) -> List[str]:
+        return sorted(cls.load().keys())
+
+    @classmethod
+    def aggregate(cls, names: List[str]) -> List[Dict]:
+        wards = cls.load()
+        unknown = [n for n in names if n not in wards]
+        if unknown:
+            raise KeyError(", ".join(unknown))
+        snap = HexStore.snapshot()
+        return [{"ward": n, **aggregate_cells(wards[n], snap)} for n in names]
@@ -0,0 +1,250 @@
+# app/services/build.py
+"""
+Raster -> H3 hex metrics pipeline (LST, NDVI, population density).
+Used by scripts/build_hex_metrics.py and by background build jobs.
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+import glob
+import re
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.warp import reproject, Resampling
+from h3 import h3
+
+RASTERS_DIR = Path(__file__).resolve().parents[1] / "data" / "rasters"
+
+# H3 resolution (~460 m edge; good compromise between LST@1km and NDVI@250m)
+H3_RES = 9
+
+# Refuse bboxes that would polyfill to more cells than this (~1,000 km² at res 11)
+MAX_BUILD_CELLS = 500_000
+
+# progress(stage, fraction_done_overall)
+Progress = Callable[[str, float], None]
+
+# ------------------ scale helpers ------------------
+
+def lst_scale_to_celsius(arr: np.ndarray) -> np.ndarray:
+    """MOD11A2 LST_Day_1km: Kelvin*0.02 -> °C (filter 0 and negatives)."""
+    arr = arr.astype("float32")
+    arr[arr <= 0] = np.nan
+    return arr * 0.02 - 273.15
+
+def ndvi_scale(arr: np.ndarray) -> np.ndarray:
+    """MOD13Q1 NDVI: scale 0.0001; clamp to [-1,1]; drop extreme fills."""
+    arr = arr.astype("float32")
+    arr[arr < -2000] = np.nan
+    arr[arr > 10000] = np.nan
+    arr = arr * 0.0001
+    arr[(arr < -1) | (arr > 1)] = np.nan
+    return arr
+
+def pop_density_scale_pd_to_km2(arr: np.ndarray) -> np.ndarray:
+    """
+    WorldPop 'pd' 1km: persons per hectare.
+    Convert to persons per km² by multiplying by 100.
+    """
+    arr = arr.astype("float32")
+    # WorldPop uses -3.40282e+38 (float32 min) or negative values as nodata sometimes
+    arr[~np.isfinite(arr)] = np.nan
+    arr[arr < 0] = np.nan
+    return arr * 100.0  # persons / km^2
+
+# ------------------ raster utilities ------------------
+
+_DOY = re.compile(r"doy(\d{7})")
+
+def acquisition_date(path: str) -> Optional[date]:
+    """AppEEARS file names carry 'doyYYYYDDD…'; None when absent (e.g. WorldPop)."""
+    m = _DOY.search(Path(path).name)
+    return datetime.strptime(m.group(1), "%Y%j").date() if m else None
+
+def list_geotiffs(rasters_dir: Path, pattern: str,
+                  start: Optional[date] = None, end: Optional[date] = None):
+    files = sorted(glob.glob(str(Path(rasters_dir) / pattern), recursive=True))
+    if start is None and end is None:
+        return files
+    out = []
+    for fp in files:
+        d = acquisition_date(fp)
+        if d is None or ((start is None or d >= start) and (end is None or d <= end)):
+            out.append(fp)
+    return out
+
+def stack_mean_on_first_grid(file_list, scaler=None, on_step: Optional[Callable[[int, int], None]] = None):
+    """
+    Resamples each raster onto the grid of the first file, stacks over time,
+    and returns (mean_img, transform, crs).
+    """
+    if not file_list:
+        return None, None, None
+
+    with rasterio.open(file_list[0]) as ref:
+        ref_transform = ref.transform
+        ref_crs = ref.crs
+        ref_width = ref.width
+        ref_height = ref.height
+
+    stack = []
+    for i, fp in enumerate(file_list):
+        with rasterio.open(fp) as src:
+            data = src.read(1).astype("float32")
+            dst = np.full((ref_height, ref_width), np.nan, dtype="float32")
+            reproject(
+                source=data,
+                destination=dst,
+                src_transform=src.transform,
+                src_crs=src.crs,
+                dst_transform=ref_transform,
+                dst_crs=ref_crs,
+                resampling=Resampling.average,
+            )
+            if scaler:
+                dst = scaler(dst)
+            stack.append(dst)
+        if on_step:
+            on_step(i + 1, len(file_list))
+
+    stack = np.stack(stack, axis=0)  # (time, rows, cols)
+    mean_img = np.nanmean(stack, axis=0)
+    return mean_img, ref_transform, ref_crs
+
+def reproject_to_grid(src_img, src_transform, src_crs, dst_shape, dst_transform, dst_crs):
+    """Reproject a single 2D array to a target grid."""
+    dst = np.full(dst_shape, np.nan, dtype="float32")
+    reproject(
+        source=src_img,
+        destination=dst,
+        src_transform=src_transform,
+        src_crs=src_crs,
+        dst_transform=dst_transform,
+        dst_crs=dst_crs,
+        resampling=Resampling.average,
+    )
+    return dst
+
+# ------------------ H3 helpers ------------------
+
+def center_of_hex(hex_id):
+    lat, lon = h3.h3_to_geo(hex_id)
+    return lat, lon
+
+def lonlat_to_rowcol(transform, lon, lat):
+    col, row = ~transform * (lon, lat)
+    return int(round(row)), int(round(col))
+
+def sample_from_grid(img, transform, lon, lat):
+    r, c = lonlat_to_rowcol(transform, lon, lat)
+    if r < 0 or c < 0 or r >= img.shape[0] or c >= img.shape[1]:
+        return np.nan
+    return float(img[r, c])
+
+def estimate_bbox_cells(bbox: Sequence[float], res: int) -> int:
+    """Approximate number of res-`res` hexes in bbox, without enumerating them."""
+    minlon, minlat, maxlon, maxlat = bbox
+    height_km = (maxlat - minlat) * 111.32
+    width_km = (maxlon - minlon) * 111.32 * np.cos(np.radians((minlat + maxlat) / 2))
+    return int(height_km * width_km / h3.hex_area(res, unit="km^2"))
+
+def hexes_over_bbox(bbox: Sequence[float], res: int):
+    """Every hex at `res` whose centre lies inside bbox (minlon, minlat, maxlon, maxlat)."""
+    minlon, minlat, maxlon, maxlat = bbox
+    est = estimate_bbox_cells(bbox, res)
+    if est > MAX_BUILD_CELLS:
+        raise ValueError(f"bbox covers ~{est} cells at res {res}; the limit is {MAX_BUILD_CELLS}")
+    ring = [[minlon, minlat], [maxlon, minlat], [maxlon, maxlat], [minlon, maxlat], [minlon, minlat]]
+    return sorted(h3.polyfill({"type": "Polygon", "coordinates": [ring]}, res, geo_json_conformant=True))
+
+# ------------------ pipeline ------------------
+
+def build_hex_metrics(
+    out_parquet: Path,
+    bbox: Sequence[float],
+    res: int = H3_RES,
+    rasters_dir: Path = RASTERS_DIR,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    progress: Optional[Progress] = None,
+) -> int:
+    """
+    Build the hex metrics table from the rasters in `rasters_dir` and write it
+    to `out_parquet`. `start`/`end` limit the LST/NDVI composites used.
+    Returns the number of rows written; raises FileNotFoundError when an
+    input layer has no rasters.
+    """
+    report = progress or (lambda stage, frac: None)
+
+    def steps(stage, lo, hi):
+        return lambda i, n: report(stage, lo + (hi - lo) * i / n)
+
+    # 1) Collect rasters
+    report("collect", 0.0)
+    lst_files  = list_geotiffs(rasters_dir, "**/*LST_Day_1km*.tif", start, end)
+    ndvi_files = list_geotiffs(rasters_dir, "**/*_250m_16_days_NDVI*.tif", start, end)
+    # WorldPop population density: persons per hectare @ 1km, e.g. bgd_pd_2020_1km.tif
+    pop_files  = list_geotiffs(rasters_dir, "**/*pd*1km*.tif")
+
+    for name, files in (("LST", lst_files), ("NDVI", ndvi_files), ("WorldPop population density", pop_files)):
+        if not files:
+            raise FileNotFoundError(f"No {name} rasters found under {rasters_dir}")
+
+    # 2) Build mean LST (this defines the reference grid)
+    lst_mean, lst_transform, lst_crs = stack_mean_on_first_grid(
+        lst_files, scaler=lst_scale_to_celsius, on_step=steps("lst", 0.02, 0.35))
+
+    # 3) Build mean NDVI (then reproject to LST grid if needed)
+    ndvi_mean, ndvi_transform, ndvi_crs = stack_mean_on_first_grid(
+        ndvi_files, scaler=ndvi_scale, on_step=steps("ndvi", 0.35, 0.65))
+    if (ndvi_crs != lst_crs) or (ndvi_transform != lst_transform) or (ndvi_mean.shape != lst_mean.shape):
+        ndvi_mean = reproject_to_grid(
+            ndvi_mean, ndvi_transform, ndvi_crs,
+            lst_mean.shape, lst_transform, lst_crs
+        )
+
+    # 4) Build mean POP density (then reproject to LST grid if needed)
+    pop_mean, pop_transform, pop_crs = stack_mean_on_first_grid(
+        pop_files, scaler=pop_density_scale_pd_to_km2, on_step=steps("population", 0.65, 0.70))
+    if (pop_crs != lst_crs) or (pop_transform != lst_transform) or (pop_mean.shape != lst_mean.shape):
+        pop_mean = reproject_to_grid(
+            pop_mean, pop_transform, pop_crs,
+            lst_mean.shape, lst_transform, lst_crs
+        )
+
+    # 5) Create H3 hex set over bbox
+    report("hexes", 0.70)
+    hexes = hexes_over_bbox(bbox, res)
+
+    # 6) Sample each hex center
+    rows = []
+    step = steps("sample", 0.75, 0.98)
+    for i, hx in enumerate(hexes):
+        lat, lon = center_of_hex(hx)
+        ndvi = sample_from_grid(ndvi_mean, lst_transform, lon, lat)
+        lstc = sample_from_grid(lst_mean,  lst_transform, lon, lat)
+        popd = sample_from_grid(pop_mean,  lst_transform, lon, lat)  # persons / km²
+
+        rows.append({
+            "hex_id": hx,
+            "lat": lat,
+            "lon": lon,
+            "ndvi_mean": None if np.isnan(ndvi) else float(ndvi),
+            "lst_day_mean": None if np.isnan(lstc) else float(lstc),
+            "pop_density": None if np.isnan(popd) else float(popd),  # persons/km²
+        })
+        if i % 1000 == 0:
+            step(i, len(hexes))
+
+    # 7) Save
+    report("save", 0.98)
+    df = pd.DataFrame(rows, columns=["hex_id", "lat", "lon", "ndvi_mean", "lst_day_mean", "pop_density"])
+    df = df.dropna(subset=["ndvi_mean", "lst_day_mean"], how="all").reset_index(drop=True)
+    out_parquet = Path(out_parquet)
+    out_parquet.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(out_parquet, index=False)
+    report("done", 1.0)
+    return len(df)
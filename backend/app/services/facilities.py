@@ -0,0 +1,228 @@
+# app/services/facilities.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import json
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from app.core.logging import logger
+from .geo import HexStore, HexSnapshot
+
+FACILITIES_DIR = Path(__file__).resolve().parents[1] / "data" / "facilities"
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Raw tags (OSM-style amenity/leisure values, file stems, ...) -> our facility kinds
+KIND_ALIASES = {
+    "clinic": "clinic", "clinics": "clinic", "doctors": "clinic", "health_post": "clinic",
+    "hospital": "hospital", "hospitals": "hospital",
+    "park": "park", "parks": "park", "garden": "park", "playground": "park",
+}
+
+# Which kinds count as "already served" for each recommendation
+CLINIC_KINDS = ("clinic", "hospital")
+PARK_KINDS = ("park",)
+
+
+def normalize_kind(raw, default: Optional[str] = None) -> Optional[str]:
+    """Raw tag ("Hospitals", "garden", ...) -> facility kind, or `default` if unknown."""
+    if raw is None or (isinstance(raw, float) and np.isnan(raw)):
+        return default
+    return KIND_ALIASES.get(str(raw).strip().lower(), default)
+
+
+def _point_of(geom: dict):
+    """(lat, lon) of a GeoJSON geometry; polygons collapse to their vertex mean."""
+    if not geom:
+        return None
+    gtype = geom.get("type")
+    coords = geom.get("coordinates")
+    if gtype == "Point":
+        return float(coords[1]), float(coords[0])
+    if gtype == "MultiPoint":
+        pts = np.asarray(coords, dtype=float)
+    elif gtype == "Polygon":
+        pts = np.asarray(coords[0], dtype=float)
+    elif gtype == "MultiPolygon":
+        pts = np.concatenate([np.asarray(p[0], dtype=float) for p in coords])
+    else:
+        return None
+    if pts.size == 0:
+        return None
+    return float(pts[:, 1].mean()), float(pts[:, 0].mean())
+
+
+def parse_geojson(gj: dict, default_kind: Optional[str] = None) -> pd.DataFrame:
+    """FeatureCollection -> DataFrame[kind, name, lat, lon]."""
+    feats = gj.get("features", []) if gj.get("type") == "FeatureCollection" else [gj]
+    rows = []
+    for f in feats:
+        props = f.get("properties") or {}
+        pt = _point_of(f.get("geometry"))
+        if pt is None:
+            continue
+        raw = props.get("kind") or props.get("amenity") or props.get("leisure")
+        rows.append({
+            "kind": normalize_kind(raw, default_kind),
+            "name": props.get("name"),
+            "lat": pt[0],
+            "lon": pt[1],
+        })
+    return _clean(pd.DataFrame(rows, columns=["kind", "name", "lat", "lon"]))
+
+
+def parse_csv(path: Path, default_kind: Optional[str] = None) -> pd.DataFrame:
+    """CSV with lat/lon (or latitude/longitude) and an optional kind/amenity column."""
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lower() for c in df.columns]
+    df = df.rename(columns={"latitude": "lat", "longitude": "lon", "lng": "lon"})
+    if "lat" not in df.columns or "lon" not in df.columns:
+        raise ValueError(f"{path.name}: need lat/lon columns. Found: {list(df.columns)}")
+
+    raw = None
+    for c in ("kind", "amenity", "type"):
+        if c in df.columns:
+            raw = df[c]
+            break
+    kinds = [default_kind] * len(df) if raw is None else [normalize_kind(v, default_kind) for v in raw]
+    out = pd.DataFrame({
+        "kind": kinds,
+        "name": df["name"] if "name" in df.columns else None,
+        "lat": df["lat"],
+        "lon": df["lon"],
+    })
+    return _clean(out)
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
+    df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
+    df = df.dropna(subset=["kind", "lat", "lon"])
+    return df.reset_index(drop=True)
+
+
+def _to_xyz(lat, lon) -> np.ndarray:
+    """Lat/lon (degrees) -> unit-sphere xyz, so Euclidean KD-tree distance is a chord."""
+    la = np.radians(np.asarray(lat, dtype=float))
+    lo = np.radians(np.asarray(lon, dtype=float))
+    cl = np.cos(la)
+    return np.column_stack([cl * np.cos(lo), cl * np.sin(lo), np.sin(la)])
+
+
+def _chord_to_km(chord: np.ndarray) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+
+
+class FacilityStore:
+    """
+    Existing facilities (clinics, hospitals, parks) as points.
+    Loaded lazily from data/facilities/*.geojson|*.csv; planners can replace
+    them at runtime via /api/facilities, which bumps the version.
+    """
+    _df = None
+    _version = 0
+    _trees: Dict = {}
+    _nearest: Dict = {}
+
+    @classmethod
+    def load(cls) -> pd.DataFrame:
+        if cls._df is None:
+            frames = []
+            if FACILITIES_DIR.exists():
+                for fp in sorted(FACILITIES_DIR.iterdir()):
+                    # "clinics.csv" -> kind "clinic" unless rows say otherwise
+                    default_kind = normalize_kind(fp.stem)
+                    try:
+                        if fp.suffix.lower() in (".geojson", ".json"):
+                            frames.append(parse_geojson(json.loads(fp.read_text()), default_kind))
+                        elif fp.suffix.lower() == ".csv":
+                            frames.append(parse_csv(fp, default_kind))
+                    except Exception as e:
+                        # one broken file shouldn't take down every recommendation
+                        logger.warning("Skipping facilities file %s: %s", fp.name, e)
+            cls._set(pd.concat(frames, ignore_index=True) if frames
+                     else pd.DataFrame(columns=["kind", "name", "lat", "lon"]))
+        return cls._df
+
+    @classmethod
+    def _set(cls, df: pd.DataFrame):
+        cls._df = df
+        cls._version += 1
+        cls._trees = {}
+        cls._nearest = {}
+
+    @classmethod
+    def version(cls) -> int:
+        cls.load()
+        return cls._version
+
+    @classmethod
+    def update(cls, df: pd.DataFrame, replace: bool = True) -> pd.DataFrame:
+        """
+        Merge uploaded facilities. With replace=True the uploaded kinds
+        supersede what was loaded for those kinds; other kinds are kept.
+        """
+        cur = cls.load()
+        if replace:
+            cur = cur[~cur["kind"].isin(df["kind"].unique())]
+        cls._set(pd.concat([cur, df], ignore_index=True))
+        return cls._df
+
+    @classmethod
+    def summary(cls) -> Dict[str, int]:
+        return {str(k): int(v) for k, v in cls.load()["kind"].value_counts().items()}
+
+    @classmethod
+    def tree(cls, kinds: Iterable[str]) -> Optional[cKDTree]:
+        key = tuple(sorted(kinds))
+        df = cls.load()
+        if key not in cls._trees:
+            sub = df[df["kind"].isin(key)]
+            cls._trees[key] = cKDTree(_to_xyz(sub["lat"], sub["lon"])) if len(sub) else None
+        return cls._trees[key]
+
+
+_hex_xyz = {"version": None, "xyz": None}
+
+
+def _hex_points(snap: HexSnapshot) -> np.ndarray:
+    hit = _hex_xyz
+    if hit["version"] == snap.version:
+        return hit["xyz"]
+    xyz = _to_xyz(snap.df["lat"], snap.df["lon"])
+    if snap.version == HexStore.version():  # only cache the live table
+        _hex_xyz.update(version=snap.version, xyz=xyz)
+    return xyz
+
+
+def nearest_facility_km(kinds: Iterable[str], snap: Optional[HexSnapshot] = None) -> np.ndarray:
+    """
+    Distance (km) from every hex centre to the nearest facility of `kinds`,
+    positionally aligned with `snap.df` (default: the current HexStore
+    snapshot). One KD-tree query for the whole grid; cached until either the
+    hex table or the facilities change.
+    All-NaN when there are no facilities of those kinds.
+    """
+    snap = snap or HexStore.snapshot()
+    key = (snap.version, tuple(sorted(kinds)))
+    FacilityStore.load()
+    hit = FacilityStore._nearest.get(key)
+    if hit is not None:
+        return hit
+
+    xyz = _hex_points(snap)
+    tree = FacilityStore.tree(kinds)
+    if tree is None:
+        dist = np.full(len(xyz), np.nan)
+    else:
+        chord, _ = tree.query(xyz, k=1)
+        dist = _chord_to_km(chord)
+    dist.setflags(write=False)
+    live = (snap.version, HexStore.version())  # a request may still hold the previous table
+    for old in [kk for kk in FacilityStore._nearest if kk[0] not in live]:
+        del FacilityStore._nearest[old]
+    FacilityStore._nearest[key] = dist
+    return dist
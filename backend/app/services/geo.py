@@ -1,41 +1,170 @@
 # app/services/geo.py
 from pathlib import Path
+from typing import NamedTuple, Optional
 import pandas as pd
 import numpy as np
+from h3 import h3
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "hex_features_ext.parquet"
 
+def _z(a):
+    """Safe z-score of a Series or array: NaNs ignored, constant input -> 0."""
+    a = a.astype(float) if isinstance(a, pd.Series) else np.asarray(a, dtype=float)
+    std = np.nanstd(a)
+    return (a - np.nanmean(a)) / (std if std else 1.0)
+
+
+def _num(v):
+    return None if v is None or pd.isna(v) else float(v)
+
+
+def _item(r, extra: dict | None = None) -> dict:
+    """
+    Marker dict for one scored hex. `r` is a row (Series/dict) with hex_id,
+    lat, lon, score and the base metrics; `extra` adds fields to "why".
+    """
+    why = {k: _num(r[k]) for k in ("lst_day_mean", "ndvi_mean", "pop_density")}
+    for k, v in (extra or {}).items():
+        why[k] = _num(v)
+    return {
+        "hex_id": str(r["hex_id"]),
+        "lat": float(r["lat"]),
+        "lon": float(r["lon"]),
+        "score": float(r["score"]),
+        "why": why,
+    }
+
+
+class HexSnapshot(NamedTuple):
+    version: int
+    df: pd.DataFrame
+
+
 class HexStore:
-    """Small cache/wrapper around the hex_features.parquet."""
-    _df = None
+    """
+    Small cache/wrapper around the hex_features.parquet.
+
+    The table can be swapped under live requests (background builds), so a
+    request that needs the table more than once -- or together with anything
+    derived from it -- should take one snapshot() and pass it down instead of
+    calling load()/version() repeatedly.
+    """
+    _snap: Optional[HexSnapshot] = None  # replaced in one assignment
+    _version = 0  # bumped whenever the table is replaced; derived caches key on it
+    _index = None  # (version, hex_id -> row position)
+
+    @classmethod
+    def snapshot(cls) -> HexSnapshot:
+        snap = cls._snap
+        if snap is None:
+            cls._set(cls._read(DATA_PATH))
+            snap = cls._snap
+        return snap
 
     @classmethod
     def load(cls) -> pd.DataFrame:
-        if cls._df is None:
-            if not DATA_PATH.exists():
-                raise FileNotFoundError(f"hex_features.parquet not found at {DATA_PATH}")
+        return cls.snapshot().df
 
-            df = pd.read_parquet(DATA_PATH)
+    @classmethod
+    def version(cls) -> int:
+        return cls.snapshot().version
 
-            need = ["hex_id", "lat", "lon", "ndvi_mean", "lst_day_mean", "pop_density"]
-            missing = [c for c in need if c not in df.columns]
-            if missing:
-                raise ValueError(f"Parquet missing columns {missing}. Found: {list(df.columns)}")
+    @classmethod
+    def swap(cls, path: Path) -> pd.DataFrame:
+        """
+        Serve a freshly built parquet without a restart. The file is read and
+        validated before anything is replaced; caches keyed on version() rebuild
+        lazily on their next use.
+        """
+        cls._set(cls._read(Path(path)))
+        return cls._snap.df
+
+    @staticmethod
+    def _read(path: Path) -> pd.DataFrame:
+        if not path.exists():
+            raise FileNotFoundError(f"hex_features.parquet not found at {path}")
+
+        df = pd.read_parquet(path)
+
+        need = ["hex_id", "lat", "lon", "ndvi_mean", "lst_day_mean", "pop_density"]
+        missing = [c for c in need if c not in df.columns]
+        if missing:
+            raise ValueError(f"Parquet missing columns {missing}. Found: {list(df.columns)}")
+
+        # Basic type cleanup
+        df = df.dropna(subset=["hex_id", "lat", "lon"])
+        df["hex_id"] = df["hex_id"].astype(str)
+
+        # Replace ±inf with NaN in numeric columns, we’ll convert to None later
+        num_cols = ["ndvi_mean", "lst_day_mean", "pop_density"]
+        for c in num_cols:
+            if c in df.columns:
+                df[c] = pd.to_numeric(df[c], errors="coerce")
+                df[c] = df[c].replace([np.inf, -np.inf], np.nan)
+        if df.empty:
+            raise ValueError(f"No usable rows in {path}")
+        return df
 
-            # Basic type cleanup
-            df = df.dropna(subset=["hex_id", "lat", "lon"])
-            df["hex_id"] = df["hex_id"].astype(str)
+    @classmethod
+    def _set(cls, df: pd.DataFrame):
+        cls._version += 1
+        cls._snap = HexSnapshot(cls._version, df)
 
-            # Replace ±inf with NaN in numeric columns, we’ll convert to None later
-            num_cols = ["ndvi_mean", "lst_day_mean", "pop_density"]
-            for c in num_cols:
-                if c in df.columns:
-                    df[c] = pd.to_numeric(df[c], errors="coerce")
-                    df[c] = df[c].replace([np.inf, -np.inf], np.nan)
+    @classmethod
+    def positions(cls, hex_ids, snap: Optional[HexSnapshot] = None) -> np.ndarray:
+        """Row positions of hex_ids in the snapshot's table (-1 where the hex isn't in it)."""
+        snap = snap or cls.snapshot()
+        cached = cls._index
+        if cached is not None and cached[0] == snap.version:
+            index = cached[1]
+        else:
+            pos = pd.Series(np.arange(len(snap.df)), index=snap.df["hex_id"].to_numpy())
+            index = pos[~pos.index.duplicated()]
+            if snap.version == cls._version:  # don't let an old snapshot evict the current index
+                cls._index = (snap.version, index)
+        hit = index.index.get_indexer(list(hex_ids))
+        return np.where(hit >= 0, index.to_numpy()[hit], -1)
 
-            cls._df = df
-        return cls._df
+    @classmethod
+    def resolution(cls, snap: Optional[HexSnapshot] = None) -> int:
+        snap = snap or cls.snapshot()
+        return h3.h3_get_resolution(snap.df["hex_id"].iloc[0])
+
+
+def top_k(df: pd.DataFrame, limit: int, min_spacing: int = 0, col: str = "score") -> pd.DataFrame:
+    """
+    Highest-`col` rows, optionally spread out: with min_spacing=m a row is
+    skipped when it lies within m H3 rings of an already picked row
+    (greedy non-maximum suppression), so picks end up >= m+1 rings apart.
 
+    Every skipped row sits in the disk of some picked row, so at most
+    limit * disk_size rows are ever inspected; only that many candidates
+    are partitioned out and sorted instead of the whole table.
+    """
+    df = df.dropna(subset=["lat", "lon", col])
+    limit = int(limit)
+    if min_spacing <= 0:
+        return df.sort_values(col, ascending=False).head(limit)
+
+    disk_size = 1 + 3 * min_spacing * (min_spacing + 1)
+    scores = df[col].to_numpy(dtype=float)
+    pool = min(len(scores), limit * disk_size)
+    if pool == 0:
+        return df.iloc[:0]
+    cand = np.argpartition(-scores, pool - 1)[:pool]
+    cand = cand[np.argsort(-scores[cand], kind="stable")]
+
+    hex_ids = df["hex_id"].to_numpy()
+    picked, blocked = [], set()
+    for i in cand:
+        hx = hex_ids[i]
+        if hx in blocked:
+            continue
+        picked.append(i)
+        if len(picked) >= limit:
+            break
+        blocked.update(h3.k_ring(hx, int(min_spacing)))
+    return df.iloc[picked]
 
 
 def rank_hotspots(theme: str = "heat", limit: int = 50):
@@ -47,18 +176,12 @@ def rank_hotspots(theme: str = "heat", limit: int = 50):
     """
     df = HexStore.load().copy()
 
-    # safe z-score
-    def z(s):
-        s = s.astype(float)
-        std = s.std(ddof=0)
-        return (s - s.mean()) / (std if std else 1.0)
-
     if theme == "greenspace":
-        df["score"] = z(df["ndvi_mean"])
+        df["score"] = _z(df["ndvi_mean"])
     elif theme == "cool":
-        df["score"] = -z(df["lst_day_mean"])
+        df["score"] = -_z(df["lst_day_mean"])
     else:  # "heat"
-        df["score"] = z(df["lst_day_mean"]) + (-z(df["ndvi_mean"]))
+        df["score"] = _z(df["lst_day_mean"]) + (-_z(df["ndvi_mean"]))
 
     out = (
         df.dropna(subset=["lat", "lon", "score"])
@@ -78,11 +201,12 @@ def rank_hotspots(theme: str = "heat", limit: int = 50):
 
 
 def hex_stats(hex_id: str):
-    df = HexStore.load()
-    hit = df.loc[df["hex_id"] == str(hex_id)]
-    if hit.empty:
+    snap = HexStore.snapshot()
+    df = snap.df
+    pos = HexStore.positions([str(hex_id)], snap)[0]
+    if pos < 0:
         return None
-    r = hit.iloc[0]
+    r = df.iloc[pos]
     return {
         "hex_id": r["hex_id"],
         "ndvi_mean": None if pd.isna(r["ndvi_mean"]) else round(float(r["ndvi_mean"]), 3),
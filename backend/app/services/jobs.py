@@ -0,0 +1,298 @@
+# app/services/jobs.py
+"""
+Background dataset rebuilds.
+
+Jobs wait in a small priority queue and run on a process pool, so raster
+work never holds the GIL of the API process. Workers run at a lower OS
+priority with single-threaded BLAS. Progress is sent back over a manager
+queue; a finished build is handed to one publisher thread, which swaps it
+into HexStore without a restart (newest submission wins).
+"""
+from __future__ import annotations
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, asdict
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import heapq
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.logging import logger
+from .build import build_hex_metrics, H3_RES, RASTERS_DIR
+from .geo import HexStore, DATA_PATH
+
+BUILDS_DIR = Path(__file__).resolve().parents[1] / "data" / "builds"
+
+# finished jobs kept for GET /api/jobs; older ones (and their files) are dropped
+MAX_JOB_HISTORY = 100
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class BuildParams:
+    city: str
+    bbox: Sequence[float]
+    res: int = H3_RES
+    start: Optional[date] = None
+    end: Optional[date] = None
+    rasters_dir: Path = RASTERS_DIR
+    publish: bool = True  # hand the result to HexStore (and DATA_PATH) when done
+
+
+@dataclass
+class Job:
+    id: str
+    params: BuildParams
+    priority: int = 5
+    status: str = "queued"  # queued | running | done | failed
+    seq: int = 0  # submission order; an older build never replaces a newer one
+    stage: Optional[str] = None
+    progress: float = 0.0
+    rows: Optional[int] = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def output(self) -> Path:
+        return BUILDS_DIR / f"hex_features_{self.id}.parquet"
+
+    def to_dict(self) -> Dict:
+        d = asdict(self)
+        p = d.pop("params")
+        d["params"] = {
+            "city": p["city"], "bbox": list(p["bbox"]), "res": p["res"],
+            "start": p["start"].isoformat() if p["start"] else None,
+            "end": p["end"].isoformat() if p["end"] else None,
+            "publish": p["publish"],
+        }
+        return d
+
+
+# ------------------ worker side ------------------
+
+# Spawned workers import numpy/rasterio (and so load BLAS/GDAL) while
+# unpickling their target, before any initializer runs, so thread caps
+# have to be in the environment they inherit.
+WORKER_ENV = {
+    "OMP_NUM_THREADS": "1",
+    "OPENBLAS_NUM_THREADS": "1",
+    "MKL_NUM_THREADS": "1",
+    "GDAL_NUM_THREADS": "1",
+}
+
+
+def _init_worker(nice: int):
+    # keep builds from competing with request handling
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+def _run_build(job_id: str, params: BuildParams, out: Path, events) -> int:
+    def progress(stage, frac):
+        events.put((job_id, stage, frac))
+
+    return build_hex_metrics(
+        out, bbox=params.bbox, res=params.res,
+        rasters_dir=params.rasters_dir, start=params.start, end=params.end,
+        progress=progress,
+    )
+
+
+# ------------------ API side ------------------
+
+class JobManager:
+    """Bounded priority queue in front of a small process pool."""
+    _lock = threading.RLock()  # RLock: a done-callback may fire inside _dispatch
+    _jobs: Dict[str, Job] = {}
+    _queue: List = []  # heap of (priority, seq, job_id)
+    _seq = itertools.count()
+    _running = 0
+    _pool: Optional[ProcessPoolExecutor] = None
+    _events = None
+    _manager = None
+    _publishing: Optional[queue.Queue] = None  # finished builds waiting for the publisher
+    _published_seq = -1  # seq of the build HexStore is serving
+
+    @classmethod
+    def _start(cls):
+        if cls._pool is None:
+            ctx = mp.get_context("spawn")  # no fork of a threaded server process
+            cls._manager = ctx.Manager()
+            cls._events = cls._manager.Queue()
+            cls._pool = cls._new_pool()
+            cls._publishing = queue.Queue()
+            threading.Thread(target=cls._drain_events, args=(cls._events,),
+                             daemon=True, name="build-progress").start()
+            # swapping reads and validates the parquet; keep that off the
+            # executor's callback thread and publish one build at a time
+            threading.Thread(target=cls._publish_loop, args=(cls._publishing,),
+                             daemon=True, name="build-publish").start()
+
+    @staticmethod
+    def _new_pool() -> ProcessPoolExecutor:
+        # workers are spawned lazily, so the caps stay set in this process;
+        # its own BLAS is already loaded and not affected
+        os.environ.update(WORKER_ENV)
+        return ProcessPoolExecutor(
+            max_workers=settings.BUILD_WORKERS, mp_context=mp.get_context("spawn"),
+            initializer=_init_worker, initargs=(settings.BUILD_NICE,),
+        )
+
+    @classmethod
+    def _restart_pool(cls):
+        # caller holds _lock; a worker died (OOM kill, segfault in GDAL, ...)
+        # and the executor refuses new work until it is replaced
+        logger.warning("build pool broken; starting a new one")
+        cls._pool.shutdown(wait=False, cancel_futures=True)
+        cls._pool = cls._new_pool()
+
+    @classmethod
+    def submit(cls, params: BuildParams, priority: int = 5) -> Job:
+        """Queue a build; lower priority numbers run first. Raises QueueFull."""
+        with cls._lock:
+            queued = sum(1 for j in cls._jobs.values() if j.status == "queued")
+            if queued >= settings.BUILD_QUEUE_MAX:
+                raise QueueFull(f"{queued} build(s) already queued")
+            cls._start()
+            job = Job(id=uuid.uuid4().hex[:12], params=params, priority=priority, seq=next(cls._seq))
+            cls._jobs[job.id] = job
+            heapq.heappush(cls._queue, (priority, job.seq, job.id))
+            cls._dispatch()
+        logger.info("build job %s queued (%s)", job.id, params.city)
+        return job
+
+    @classmethod
+    def get(cls, job_id: str) -> Optional[Job]:
+        with cls._lock:
+            return cls._jobs.get(job_id)
+
+    @classmethod
+    def all(cls) -> List[Job]:
+        with cls._lock:  # _prune deletes under the lock
+            jobs = list(cls._jobs.values())
+        return sorted(jobs, key=lambda j: j.created, reverse=True)
+
+    @classmethod
+    def _dispatch(cls):
+        # caller holds _lock
+        while cls._queue and cls._running < settings.BUILD_WORKERS:
+            _, _, job_id = heapq.heappop(cls._queue)
+            job = cls._jobs[job_id]
+            try:
+                fut = cls._pool.submit(_run_build, job.id, job.params, job.output, cls._events)
+            except Exception as e:
+                job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+                job.finished = time.time()
+                logger.error("build job %s could not start: %s", job_id, job.error)
+                if isinstance(e, BrokenProcessPool):
+                    cls._restart_pool()
+                continue
+            job.status, job.started, job.stage = "running", time.time(), "starting"
+            cls._running += 1
+            fut.add_done_callback(lambda f, jid=job.id, pool=cls._pool: cls._finish(jid, f, pool))
+
+    @classmethod
+    def _finish(cls, job_id: str, fut: Future, pool: ProcessPoolExecutor):
+        job = cls._jobs[job_id]
+        try:
+            job.rows = fut.result()
+        except (Exception, CancelledError) as e:
+            cls._fail(job, e)
+        else:
+            publishing = cls._publishing
+            if job.params.publish and publishing is None:
+                cls._fail(job, RuntimeError("job manager shut down before publishing"))
+            elif job.params.publish:
+                job.stage = "publishing"
+                publishing.put(job)
+            else:
+                job.status, job.stage, job.progress = "done", "done", 1.0
+                job.finished = time.time()
+                logger.info("build job %s done (%s rows)", job_id, job.rows)
+        finally:
+            # the worker is free as soon as the build is written
+            with cls._lock:
+                cls._running -= 1
+                broken = not fut.cancelled() and isinstance(fut.exception(), BrokenProcessPool)
+                if broken and pool is cls._pool:  # only the first failed job replaces it
+                    cls._restart_pool()
+                cls._prune()
+                cls._dispatch()
+
+    @classmethod
+    def _prune(cls):
+        # caller holds _lock
+        done = sorted((j for j in cls._jobs.values() if j.finished is not None),
+                      key=lambda j: j.finished)
+        for job in done[:max(0, len(done) - MAX_JOB_HISTORY)]:
+            job.output.unlink(missing_ok=True)
+            del cls._jobs[job.id]
+
+    @staticmethod
+    def _fail(job: Job, e: BaseException):
+        job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+        job.finished = time.time()
+        job.output.unlink(missing_ok=True)  # partial output
+        logger.error("build job %s failed: %s", job.id, job.error)
+
+    @classmethod
+    def _publish_loop(cls, jobs: queue.Queue):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return  # shutdown
+            try:
+                if job.seq < cls._published_seq:
+                    job.stage = "superseded"  # a later submission is already served
+                else:
+                    cls._publish(job)
+                    cls._published_seq = job.seq
+                    job.stage = "done"
+                job.status, job.progress = "done", 1.0
+                job.finished = time.time()
+                # published builds live on in DATA_PATH
+                job.output.unlink(missing_ok=True)
+                logger.info("build job %s %s (%s rows)", job.id, job.stage, job.rows)
+            except Exception as e:
+                cls._fail(job, e)
+
+    @staticmethod
+    def _publish(job: Job):
+        # validate + serve first, then persist atomically for the next restart
+        HexStore.swap(job.output)
+        tmp = DATA_PATH.with_suffix(".tmp")
+        shutil.copyfile(job.output, tmp)
+        os.replace(tmp, DATA_PATH)
+
+    @classmethod
+    def _drain_events(cls, events):
+        while True:
+            try:
+                job_id, stage, frac = events.get()
+            except (EOFError, OSError):
+                return  # manager went away (shutdown)
+            job = cls._jobs.get(job_id)
+            if job and job.status == "running":
+                job.stage, job.progress = stage, round(float(frac), 3)
+
+    @classmethod
+    def shutdown(cls):
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=False, cancel_futures=True)
+            cls._manager.shutdown()
+            cls._publishing.put(None)
+            cls._pool = cls._manager = cls._events = cls._publishing = None
@@ -0,0 +1,134 @@
+# app/services/neighborhood.py
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from h3 import h3
+
+from .geo import HexStore, HexSnapshot, _z
+
+# theme -> (column, statistic, sign); all scores are "higher = more of a hotspot"
+NEIGHBORHOOD_THEMES = {
+    "heat_gi": ("lst_day_mean", "gi", 1.0),          # clusters of hot hexes
+    "cool_gi": ("lst_day_mean", "gi", -1.0),         # clusters of cool hexes
+    "greenspace_gi": ("ndvi_mean", "gi", 1.0),       # clusters of green hexes
+    "heat_smooth": (None, "smooth", 1.0),            # k-ring smoothed LST minus NDVI
+}
+
+_adjacency: Dict[Tuple[int, int], sp.csr_matrix] = {}
+
+
+def _ring1(snap: HexSnapshot) -> sp.csr_matrix:
+    """
+    1-ring adjacency (self included) from h3.k_ring; the only per-hex H3 pass.
+    A Python loop over the table: ~0.3 s for 15k hexes, growing linearly.
+    """
+    ids = snap.df["hex_id"].to_numpy()
+    rows, nbrs = [], []
+    for i, hx in enumerate(ids):
+        ring = h3.k_ring(hx, 1)
+        rows.append(np.full(len(ring), i, dtype=np.int64))
+        nbrs.extend(ring)
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    cols = HexStore.positions(nbrs, snap)
+    keep = cols >= 0  # ring cells outside the study area
+    n = len(ids)
+    return sp.csr_matrix(
+        (np.ones(int(keep.sum()), dtype=np.int8), (rows[keep], cols[keep])), shape=(n, n)
+    )
+
+
+def adjacency(k: int = 1, snap: Optional[HexSnapshot] = None) -> sp.csr_matrix:
+    """
+    Binary k-ring adjacency over the hex table (self included, as Gi* wants),
+    rows/cols in snap.df order (default: the current snapshot).
+
+    Built lazily: the first neighbourhood request after a (re)load pays for
+    the 1-ring matrix (see _ring1), so loads and swaps don't block on it.
+    Wider rings are boolean sparse powers of it (cells reachable in k steps
+    through the grid), cached per version. Every neighbourhood statistic is
+    then a sparse mat-vec.
+    """
+    snap = snap or HexStore.snapshot()
+    v = snap.version
+    if (v, k) not in _adjacency:
+        live = (v, HexStore.version())  # a request may still hold the previous table
+        for old in [kk for kk in _adjacency if kk[0] not in live]:
+            del _adjacency[old]
+        if (v, 1) not in _adjacency:
+            _adjacency[(v, 1)] = _ring1(snap)
+        a1 = _adjacency[(v, 1)]
+        ak = a1
+        for _ in range(k - 1):
+            ak = ((ak @ a1) > 0).astype(np.int8)
+        _adjacency[(v, k)] = ak.tocsr()
+    return _adjacency[(v, k)]
+
+
+def _neighbour_sums(x: np.ndarray, k: int, snap: HexSnapshot) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(sum of valid neighbour values, count of valid neighbours, valid mask)."""
+    W = adjacency(k, snap)
+    valid = ~np.isnan(x)
+    wx = W @ np.where(valid, x, 0.0)
+    wn = W @ valid.astype(float)
+    return wx, wn, valid
+
+
+def smoothed(x: np.ndarray, k: int = 1, snap: Optional[HexSnapshot] = None) -> np.ndarray:
+    """k-ring mean of x (aligned with snap.df), ignoring NaN neighbours."""
+    wx, wn, _ = _neighbour_sums(x, k, snap or HexStore.snapshot())
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(wn > 0, wx / wn, np.nan)
+
+
+def getis_ord_gi_star(x: np.ndarray, k: int = 1, snap: Optional[HexSnapshot] = None) -> np.ndarray:
+    """
+    Getis-Ord Gi* z-score per hex with binary k-ring weights (self included).
+    NaN values are left out of both the global moments and the local sums,
+    and hexes that are NaN themselves get NaN.
+    """
+    wx, wn, valid = _neighbour_sums(x, k, snap or HexStore.snapshot())
+    n = int(valid.sum())
+    if n < 2:
+        return np.full(len(x), np.nan)
+    xv = x[valid]
+    xbar = xv.mean()
+    s = xv.std()
+    # binary weights: sum(w^2) == sum(w) == wn
+    with np.errstate(invalid="ignore", divide="ignore"):
+        den = s * np.sqrt((n * wn - wn ** 2) / (n - 1))
+        gi = (wx - xbar * wn) / den
+    # hexes without their own reading get no score, however hot their neighbours
+    return np.where(valid & (wn > 0) & (den > 0), gi, np.nan)
+
+
+def neighborhood_scores(theme: str, k: int = 1, snap: Optional[HexSnapshot] = None) -> np.ndarray:
+    snap = snap or HexStore.snapshot()
+    df = snap.df
+    col, stat, sign = NEIGHBORHOOD_THEMES[theme]
+    if stat == "smooth":
+        lst = smoothed(df["lst_day_mean"].to_numpy(dtype=float), k, snap)
+        ndvi = smoothed(df["ndvi_mean"].to_numpy(dtype=float), k, snap)
+        return _z(lst) - _z(ndvi)
+    return sign * getis_ord_gi_star(df[col].to_numpy(dtype=float), k, snap)
+
+
+def rank_neighborhood_hotspots(theme: str, limit: int = 50, k: int = 1) -> List[Dict]:
+    snap = HexStore.snapshot()
+    df = snap.df[["hex_id", "lat", "lon"]]
+    df = df.assign(score=neighborhood_scores(theme, k, snap))
+    out = (
+        df.dropna(subset=["lat", "lon", "score"])
+          .sort_values("score", ascending=False)
+          .head(int(limit))
+    )
+    return [
+        {
+            "hex_id": r["hex_id"],
+            "lat": float(r["lat"]),
+            "lon": float(r["lon"]),
+            "score": float(r["score"]),
+        }
+        for _, r in out.iterrows()
+    ]
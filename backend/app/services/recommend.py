@@ -4,83 +4,66 @@ from typing import List, Dict
 import numpy as np
 import pandas as pd
 
-from .geo import HexStore
+from .geo import HexStore, top_k, _z, _item
+from .facilities import nearest_facility_km, CLINIC_KINDS, PARK_KINDS
 
-def _z(s: pd.Series) -> pd.Series:
-    s = s.astype(float)
-    std = s.std(ddof=0)
-    return (s - s.mean()) / (std if std else 1.0)
+def _access_gap(dist_km: pd.Series) -> pd.Series:
+    """
+    Farther from an existing facility -> higher score.
+    Zero everywhere when no facilities of that kind are loaded.
+    """
+    if dist_km.isna().all():
+        return pd.Series(0.0, index=dist_km.index)
+    return _z(dist_km).fillna(0.0)
+
+def park_score(heat, bare, gap, popw):
+    """Park score from its standardised terms; works on Series or ndarrays."""
+    return (heat + bare + gap) * (1.0 + popw)
 
-def suggest_parks(limit: int = 10) -> List[Dict]:
+def suggest_parks(limit: int = 10, min_spacing: int = 0) -> List[Dict]:
     """
     Recommend hexes that are HOT and BARE (low NDVI) where people live.
     Higher score = better candidate for planting/park intervention.
+    min_spacing > 0 skips hexes within that many H3 rings of a better pick.
     """
-    df = HexStore.load().copy()
+    snap = HexStore.snapshot()
+    df = snap.df.copy()
     # safety fills
     df["ndvi_mean"] = df["ndvi_mean"].astype(float)
     df["lst_day_mean"] = df["lst_day_mean"].astype(float)
     df["pop_density"] = df["pop_density"].fillna(0).astype(float)
+    df["nearest_park_km"] = nearest_facility_km(PARK_KINDS, snap)
 
-    # score: hot + bare + populated
+    # score: hot + bare + populated + far from existing parks
     heat = _z(df["lst_day_mean"])
     bare = -_z(df["ndvi_mean"])  # lower NDVI → higher score
+    gap = _access_gap(df["nearest_park_km"])
     popw = np.log1p(df["pop_density"])  # gentle weight so 0 doesn’t kill it
 
-    df["score"] = (heat + bare) * (1.0 + popw)
+    df["score"] = park_score(heat, bare, gap, popw)
 
-    out = (
-        df.dropna(subset=["lat", "lon", "score"])
-          .sort_values("score", ascending=False)
-          .head(int(limit))
-    )
+    out = top_k(df, limit, min_spacing=min_spacing)
 
-    return [
-        {
-            "hex_id": str(r["hex_id"]),
-            "lat": float(r["lat"]),
-            "lon": float(r["lon"]),
-            "score": float(r["score"]),
-            "why": {
-                "lst_day_mean": None if pd.isna(r["lst_day_mean"]) else float(r["lst_day_mean"]),
-                "ndvi_mean": None if pd.isna(r["ndvi_mean"]) else float(r["ndvi_mean"]),
-                "pop_density": None if pd.isna(r["pop_density"]) else float(r["pop_density"]),
-            },
-        }
-        for _, r in out.iterrows()
-    ]
+    return [_item(r, {"nearest_park_km": r["nearest_park_km"]}) for _, r in out.iterrows()]
 
-def suggest_clinics(limit: int = 10) -> List[Dict]:
+def suggest_clinics(limit: int = 10, min_spacing: int = 0) -> List[Dict]:
     """
-    Recommend hexes that are HOT and POPULATED (proxy for exposure).
-    (Later you can subtract proximity to existing clinics.)
+    Recommend hexes that are HOT and POPULATED (proxy for exposure)
+    and FAR from existing clinics/hospitals.
+    min_spacing > 0 skips hexes within that many H3 rings of a better pick.
     """
-    df = HexStore.load().copy()
+    snap = HexStore.snapshot()
+    df = snap.df.copy()
     df["ndvi_mean"] = df["ndvi_mean"].astype(float)
     df["lst_day_mean"] = df["lst_day_mean"].astype(float)
     df["pop_density"] = df["pop_density"].fillna(0).astype(float)
+    df["nearest_clinic_km"] = nearest_facility_km(CLINIC_KINDS, snap)
 
     heat = _z(df["lst_day_mean"])
     popz = _z(df["pop_density"])
-    df["score"] = heat + popz
+    gap = _access_gap(df["nearest_clinic_km"])
+    df["score"] = heat + popz + gap
 
-    out = (
-        df.dropna(subset=["lat", "lon", "score"])
-          .sort_values("score", ascending=False)
-          .head(int(limit))
-    )
+    out = top_k(df, limit, min_spacing=min_spacing)
 
-    return [
-        {
-            "hex_id": str(r["hex_id"]),
-            "lat": float(r["lat"]),
-            "lon": float(r["lon"]),
-            "score": float(r["score"]),
-            "why": {
-                "lst_day_mean": None if pd.isna(r["lst_day_mean"]) else float(r["lst_day_mean"]),
-                "ndvi_mean": None if pd.isna(r["ndvi_mean"]) else float(r["ndvi_mean"]),
-                "pop_density": None if pd.isna(r["pop_density"]) else float(r["pop_density"]),
-            },
-        }
-        for _, r in out.iterrows()
-    ]
+    return [_item(r, {"nearest_clinic_km": r["nearest_clinic_km"]}) for _, r in out.iterrows()]
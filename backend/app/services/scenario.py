@@ -0,0 +1,283 @@
+# app/services/scenario.py
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import uuid
+
+import numpy as np
+import pandas as pd
+from h3 import h3
+
+from .geo import HexStore, HexSnapshot, _item
+from .facilities import FacilityStore, nearest_facility_km, PARK_KINDS
+from .recommend import park_score, _access_gap
+
+MAX_SCENARIOS = 64
+
+
+@dataclass(frozen=True)
+class Cooling:
+    """
+    Simple NDVI -> LST response: +1.0 NDVI cools the greened hex by
+    `per_ndvi` °C, and ring r around it by per_ndvi * decay**r, up to `rings`.
+    """
+    per_ndvi: float = 10.0
+    rings: int = 1
+    decay: float = 0.5
+
+
+class ParkBaseline:
+    """
+    Un-modified park-score inputs for one hex snapshot and facility version,
+    computed once and shared by every scenario built on it. Scenarios only
+    ever read from it, and keep their own reference, so a dataset swap can't
+    change the table underneath one.
+    """
+    _current: Optional["ParkBaseline"] = None
+
+    def __init__(self, snap: HexSnapshot, key: tuple):
+        self.key = key
+        self.snap = snap
+        df = snap.df
+        self.lst = df["lst_day_mean"].to_numpy(dtype=float)
+        self.ndvi = df["ndvi_mean"].to_numpy(dtype=float)
+        self.popw = np.log1p(df["pop_density"].fillna(0).to_numpy(dtype=float))
+        gap = _access_gap(pd.Series(nearest_facility_km(PARK_KINDS, snap)))
+        self.gap = gap.to_numpy(dtype=float)
+        self.lst_mu, self.lst_sd = _moments(self.lst)
+        self.ndvi_mu, self.ndvi_sd = _moments(self.ndvi)
+        self.score = self.rescore(np.arange(len(df)), self.lst, self.ndvi)
+        # best first, NaN scores dropped
+        ok = np.flatnonzero(~np.isnan(self.score))
+        self.order = ok[np.argsort(-self.score[ok], kind="stable")]
+
+    @classmethod
+    def get(cls) -> "ParkBaseline":
+        """Baseline for the current hex table and facilities."""
+        snap = HexStore.snapshot()
+        key = (snap.version, FacilityStore.version())
+        cur = cls._current
+        if cur is None or cur.key != key:
+            cur = cls(snap, key)
+            cls._current = cur
+        return cur
+
+    def positions(self, hex_ids) -> np.ndarray:
+        return HexStore.positions(hex_ids, self.snap)
+
+    def rescore(self, pos: np.ndarray, lst: np.ndarray, ndvi: np.ndarray) -> np.ndarray:
+        """Park score of rows `pos` given their (possibly modified) LST/NDVI."""
+        heat = (lst - self.lst_mu) / self.lst_sd
+        bare = -(ndvi - self.ndvi_mu) / self.ndvi_sd
+        return park_score(heat, bare, self.gap[pos], self.popw[pos])
+
+
+def _moments(a: np.ndarray) -> Tuple[float, float]:
+    sd = np.nanstd(a)
+    return float(np.nanmean(a)), float(sd if sd else 1.0)
+
+
+@dataclass
+class Scenario:
+    """
+    Copy-on-write overlay of the hex table: only modified rows are stored
+    (row position -> new value); everything else reads through to the baseline.
+    """
+    id: str
+    cooling: Cooling
+    base: ParkBaseline = field(repr=False, compare=False)
+    interventions: List[Tuple[str, float]] = field(default_factory=list)
+    ndvi: Dict[int, float] = field(default_factory=dict)
+    lst: Dict[int, float] = field(default_factory=dict)
+    score: Dict[int, float] = field(default_factory=dict)
+    # running sums over valid values, so city means update in O(changed)
+    lst_sum: float = 0.0
+    lst_n: int = 0
+    ndvi_sum: float = 0.0
+    ndvi_n: int = 0
+
+    @classmethod
+    def empty(cls, cooling: Cooling) -> "Scenario":
+        base = ParkBaseline.get()
+        ok_l, ok_n = ~np.isnan(base.lst), ~np.isnan(base.ndvi)
+        return cls(
+            id=uuid.uuid4().hex[:12],
+            cooling=cooling,
+            base=base,
+            lst_sum=float(base.lst[ok_l].sum()), lst_n=int(ok_l.sum()),
+            ndvi_sum=float(base.ndvi[ok_n].sum()), ndvi_n=int(ok_n.sum()),
+        )
+
+    def fork(self) -> "Scenario":
+        return Scenario(
+            id=uuid.uuid4().hex[:12], cooling=self.cooling, base=self.base,
+            interventions=list(self.interventions),
+            ndvi=dict(self.ndvi), lst=dict(self.lst), score=dict(self.score),
+            lst_sum=self.lst_sum, lst_n=self.lst_n,
+            ndvi_sum=self.ndvi_sum, ndvi_n=self.ndvi_n,
+        )
+
+    def _get(self, overlay: Dict[int, float], base: np.ndarray, pos: int) -> float:
+        return overlay.get(pos, base[pos])
+
+    def _set(self, which: str, pos: int, value: float):
+        base = getattr(self.base, which)
+        overlay = getattr(self, which)
+        old = self._get(overlay, base, pos)
+        if np.isnan(old):
+            return  # no baseline reading to adjust
+        setattr(self, f"{which}_sum", getattr(self, f"{which}_sum") + value - old)
+        overlay[pos] = value
+
+    def apply(self, interventions: List[Tuple[str, float]]) -> List[str]:
+        """
+        Apply (hex_id, ndvi_delta) pairs; returns the hex_ids that were skipped
+        (not in the table, or no NDVI reading).
+        Only the greened hexes and their cooling rings are touched and rescored.
+        """
+        base = self.base
+        c = self.cooling
+        missing, touched = [], set()
+        for hex_id, delta in interventions:
+            pos = int(base.positions([hex_id])[0])
+            if pos < 0:
+                missing.append(hex_id)
+                continue
+            old = self._get(self.ndvi, base.ndvi, pos)
+            if np.isnan(old):
+                missing.append(hex_id)
+                continue
+            new = float(np.clip(old + delta, -1.0, 1.0))
+            self._set("ndvi", pos, new)
+            self.interventions.append((hex_id, float(delta)))
+            touched.add(pos)
+
+            applied = new - old
+            for r in range(c.rings + 1):
+                ring = list(h3.hex_ring(hex_id, r)) if r else [hex_id]
+                npos = base.positions(ring)
+                dt = -c.per_ndvi * applied * (c.decay ** r)
+                for p in npos[npos >= 0]:
+                    p = int(p)
+                    cur = self._get(self.lst, base.lst, p)
+                    if not np.isnan(cur):
+                        self._set("lst", p, cur + dt)
+                        touched.add(p)
+
+        if touched:
+            pos = np.fromiter(touched, dtype=np.int64)
+            lst = np.array([self._get(self.lst, base.lst, p) for p in pos])
+            ndvi = np.array([self._get(self.ndvi, base.ndvi, p) for p in pos])
+            for p, sc in zip(pos, base.rescore(pos, lst, ndvi)):
+                self.score[int(p)] = float(sc)
+        return missing
+
+    def top_parks(self, limit: int = 10) -> List[int]:
+        """
+        Merge the baseline ranking (minus changed rows) with the rescored
+        changed rows: O(limit + changed) instead of a full re-sort.
+        """
+        base = self.base
+        changed = sorted(
+            ((s, p) for p, s in self.score.items() if not np.isnan(s)), reverse=True
+        )
+        out, ci = [], 0
+        for p in base.order:
+            if len(out) >= limit:
+                break
+            if p in self.score:
+                continue
+            while ci < len(changed) and changed[ci][0] > base.score[p] and len(out) < limit:
+                out.append(changed[ci][1])
+                ci += 1
+            if len(out) < limit:
+                out.append(int(p))
+        while ci < len(changed) and len(out) < limit:
+            out.append(changed[ci][1])
+            ci += 1
+        return out
+
+    def summary(self, limit: int = 10) -> Dict:
+        base = self.base
+        df = base.snap.df
+        hex_ids = df["hex_id"].to_numpy()
+        lats, lons = df["lat"].to_numpy(), df["lon"].to_numpy()
+        pop = df["pop_density"].to_numpy(dtype=float)
+
+        def item(p: int) -> Dict:
+            lst = self._get(self.lst, base.lst, p)
+            row = {
+                "hex_id": hex_ids[p], "lat": lats[p], "lon": lons[p],
+                "score": self.score.get(p, base.score[p]),
+                "lst_day_mean": lst,
+                "ndvi_mean": self._get(self.ndvi, base.ndvi, p),
+                "pop_density": pop[p],
+            }
+            lst_change = round(float(lst - base.lst[p]), 3) if p in self.lst else 0.0
+            return _item(row, {"lst_change": lst_change})
+
+        base_lst_mean = float(np.nanmean(base.lst))
+        return {
+            "id": self.id,
+            "interventions": len(self.interventions),
+            "changed_hexes": len(self.score),
+            "city": {
+                "lst_day_mean": round(self.lst_sum / self.lst_n, 3) if self.lst_n else None,
+                "lst_day_mean_change": round(self.lst_sum / self.lst_n - base_lst_mean, 4) if self.lst_n else None,
+                "ndvi_mean": round(self.ndvi_sum / self.ndvi_n, 4) if self.ndvi_n else None,
+            },
+            "changes": [
+                {
+                    "hex_id": str(hex_ids[p]),
+                    "lst_change": round(float(self.lst[p] - base.lst[p]), 3) if p in self.lst else 0.0,
+                    "ndvi_change": round(float(self.ndvi[p] - base.ndvi[p]), 3) if p in self.ndvi else 0.0,
+                }
+                for p in sorted(set(self.lst) | set(self.ndvi))
+            ],
+            "parks": [item(p) for p in self.top_parks(limit)],
+        }
+
+
+class ScenarioStore:
+    """Scenarios by id (LRU), so the map can flip between them without recomputing."""
+    _items: "OrderedDict[str, Scenario]" = OrderedDict()
+
+    @classmethod
+    def create(cls, interventions: List[Tuple[str, float]], cooling: Optional[Cooling] = None,
+               parent: Optional[str] = None) -> Tuple[Scenario, List[str]]:
+        if parent:
+            base = cls.get(parent)
+            if base is None:
+                raise KeyError(parent)
+            s = base.fork()
+        else:
+            s = Scenario.empty(cooling or Cooling())
+        missing = s.apply(interventions)
+        cls._put(s)
+        return s, missing
+
+    @classmethod
+    def get(cls, scenario_id: str) -> Optional[Scenario]:
+        s = cls._items.get(scenario_id)
+        if s is None:
+            return None
+        if s.base.key != ParkBaseline.get().key:
+            # dataset was rebuilt underneath: replay onto the new baseline
+            fresh = Scenario.empty(s.cooling)
+            fresh.id = s.id
+            fresh.apply(s.interventions)
+            s = fresh
+        cls._put(s)
+        return s
+
+    @classmethod
+    def delete(cls, scenario_id: str) -> bool:
+        return cls._items.pop(scenario_id, None) is not None
+
+    @classmethod
+    def _put(cls, s: Scenario):
+        cls._items[s.id] = s
+        cls._items.move_to_end(s.id)
+        if len(cls._items) > MAX_SCENARIOS:
+            cls._items.popitem(last=False)
@@ -0,0 +1,222 @@
+# app/services/scoring.py
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+import ast
+import keyword
+
+import numpy as np
+import pandas as pd
+
+from .geo import HexStore, HexSnapshot, top_k, _z, _item
+from .facilities import FacilityStore, nearest_facility_km, CLINIC_KINDS, PARK_KINDS
+
+# Short names planners actually type
+ALIASES = {
+    "lst": "lst_day_mean",
+    "heat": "lst_day_mean",
+    "ndvi": "ndvi_mean",
+    "green": "ndvi_mean",
+    "pop": "pop_density",
+    "clinic_km": "nearest_clinic_km",
+    "park_km": "nearest_park_km",
+}
+
+# name -> (numpy function, number of arguments)
+FUNCS = {
+    "abs": (np.abs, 1),
+    "sqrt": (np.sqrt, 1),
+    "log1p": (np.log1p, 1),
+    "exp": (np.exp, 1),
+    "min": (np.minimum, 2),
+    "max": (np.maximum, 2),
+    "clip": (np.clip, 3),
+}
+
+BINOPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+}
+
+MAX_CACHED_SCORES = 128
+
+
+def _build_columns(snap: HexSnapshot) -> Tuple[Dict[str, np.ndarray], Dict[str, str]]:
+    """
+    Every name an expression can use, as float arrays aligned with snap.df:
+      <metric>      z-score
+      log_<metric>  z-score of log1p(metric)
+      raw_<metric>  untransformed value
+    Also returns {name: reason} for names that can't be used right now.
+    """
+    df = snap.df
+    raw = {
+        "lst_day_mean": df["lst_day_mean"].to_numpy(dtype=float),
+        "ndvi_mean": df["ndvi_mean"].to_numpy(dtype=float),
+        "pop_density": df["pop_density"].fillna(0).to_numpy(dtype=float),
+        "nearest_clinic_km": nearest_facility_km(CLINIC_KINDS, snap),
+        "nearest_park_km": nearest_facility_km(PARK_KINDS, snap),
+    }
+    cols, unavailable = {}, {}
+    for name, a in raw.items():
+        if np.isnan(a).all():
+            # e.g. no facilities loaded: the standardised terms contribute nothing
+            # instead of NaN-ing every score, but there is no raw value to offer
+            zeros = np.zeros(len(a))
+            cols[name] = cols[f"log_{name}"] = zeros
+            unavailable[f"raw_{name}"] = "no data loaded (e.g. no facilities uploaded)"
+            continue
+        cols[name] = _z(a)
+        cols[f"log_{name}"] = _z(np.log1p(np.clip(a, 0, None)))
+        cols[f"raw_{name}"] = a
+    for alias, name in ALIASES.items():
+        cols[alias] = cols[name]
+        cols[f"log_{alias}"] = cols[f"log_{name}"]
+        if f"raw_{name}" in cols:
+            cols[f"raw_{alias}"] = cols[f"raw_{name}"]
+        else:
+            unavailable[f"raw_{alias}"] = unavailable[f"raw_{name}"]
+    for a in cols.values():
+        a.setflags(write=False)
+    return cols, unavailable
+
+
+class _ScoreState:
+    """Columns + memoised scores built from one HexStore snapshot."""
+
+    def __init__(self, key: tuple, snap: HexSnapshot):
+        self.key = key
+        self.df = snap.df
+        self.cols, self.unavailable = _build_columns(snap)
+        self.scores: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+
+class ScoreCache:
+    """
+    Standardised columns + memoised score vectors for one dataset version.
+    The whole state is replaced in one assignment, so a request that holds it
+    keeps a matching (df, columns, scores) set even if the table is swapped.
+    """
+    _state: Optional[_ScoreState] = None
+
+    @classmethod
+    def _check(cls) -> _ScoreState:
+        snap = HexStore.snapshot()
+        key = (snap.version, FacilityStore.version())
+        state = cls._state
+        if state is None or state.key != key:
+            state = _ScoreState(key, snap)
+            cls._state = state
+        return state
+
+    @classmethod
+    def columns(cls) -> Dict[str, np.ndarray]:
+        return cls._check().cols
+
+    @classmethod
+    def score(cls, expression: str) -> Tuple[np.ndarray, pd.DataFrame]:
+        """Score vector for `expression` and the hex table it is aligned with."""
+        state = cls._check()
+        fn, canon = compile_expression(expression, state.cols.keys(), state.unavailable)
+        hit = state.scores.get(canon)
+        if hit is not None:
+            state.scores.move_to_end(canon)
+            return hit, state.df
+
+        with np.errstate(all="ignore"):
+            out = np.broadcast_to(np.asarray(fn(state.cols), dtype=float), (len(state.df),))
+        out = np.where(np.isfinite(out), out, np.nan)
+        out.setflags(write=False)
+        state.scores[canon] = out
+        if len(state.scores) > MAX_CACHED_SCORES:
+            state.scores.popitem(last=False)
+        return out, state.df
+
+
+def weights_to_expression(weights: Dict[str, float]) -> str:
+    """{"heat": 2, "pop": 1, "ndvi": -1} -> "2.0 * heat + 1.0 * pop + -1.0 * ndvi" (name-sorted)."""
+    if not weights:
+        raise ValueError("weights must not be empty")
+    for name, w in weights.items():
+        # each key must stay a single column name once pasted into the text
+        if not name.isidentifier() or keyword.iskeyword(name):
+            raise ValueError(f"Weight key '{name}' is not a column name")
+        if not np.isfinite(w):
+            raise ValueError(f"Weight for '{name}' must be a finite number")
+    return " + ".join(f"{float(w)!r} * {name}" for name, w in sorted(weights.items()))
+
+
+def compile_expression(expression: str, names, unavailable: Optional[Dict[str, str]] = None) -> tuple[Callable, str]:
+    """
+    Parse a small arithmetic expression into a vectorised evaluator.
+    Only numbers, known column names, + - * / **, unary +/- and FUNCS are
+    allowed; anything else raises ValueError. Returns (fn(cols), canonical_text).
+    """
+    names = set(names)
+    unavailable = unavailable or {}
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}") from None
+
+    def build(node) -> Callable:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            v = float(node.value)
+            return lambda cols: v
+        if isinstance(node, ast.Name):
+            if node.id in unavailable:
+                raise ValueError(f"Column '{node.id}' unavailable: {unavailable[node.id]}")
+            if node.id not in names:
+                raise ValueError(f"Unknown column '{node.id}'")
+            key = node.id
+            return lambda cols: cols[key]
+        if isinstance(node, ast.BinOp) and type(node.op) in BINOPS:
+            op, left, right = BINOPS[type(node.op)], build(node.left), build(node.right)
+            return lambda cols: op(left(cols), right(cols))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            inner = build(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda cols: np.negative(inner(cols))
+            return inner
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+                and node.func.id in FUNCS and not node.keywords:
+            fn, nargs = FUNCS[node.func.id]
+            if len(node.args) != nargs:
+                raise ValueError(f"{node.func.id}() takes {nargs} argument(s)")
+            args = [build(a) for a in node.args]
+            return lambda cols: fn(*(a(cols) for a in args))
+        raise ValueError(f"Unsupported syntax: {ast.unparse(node)}")
+
+    return build(tree.body), ast.unparse(tree)
+
+
+def score_top(expression: str, limit: int = 10, min_spacing: int = 0) -> List[Dict]:
+    scores, df = ScoreCache.score(expression)
+    df = df[["hex_id", "lat", "lon", "lst_day_mean", "ndvi_mean", "pop_density"]]
+    out = top_k(df.assign(score=scores), limit, min_spacing=min_spacing)
+    return [_item(r) for _, r in out.iterrows()]
+
+
+def score_column(expression: str) -> Dict[str, list]:
+    scores, df = ScoreCache.score(expression)
+    vals = np.round(scores, 4).astype(object)
+    vals[np.isnan(scores)] = None
+    return {"hex_id": df["hex_id"].tolist(), "score": vals.tolist()}
+
+
+def available_columns() -> List[str]:
+    return sorted(ScoreCache.columns().keys())
+
+
+def resolve_expression(expression: Optional[str], weights: Optional[Dict[str, float]]) -> str:
+    if expression and weights:
+        raise ValueError("Give either 'expression' or 'weights', not both")
+    if expression:
+        return expression
+    if weights:
+        return weights_to_expression(weights)
+    raise ValueError("Give an 'expression' or 'weights'")
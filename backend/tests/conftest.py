@@ -0,0 +1,86 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import rasterio
+from h3 import h3
+from rasterio.transform import from_bounds
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))  # so `app` imports when pytest runs from backend/
+
+# the chat router builds its OpenAI client at import time
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+# minlon, minlat, maxlon, maxlat — a few km² of Dhaka
+BBOX = (90.40, 23.80, 90.42, 23.82)
+
+
+def _write_tif(path: Path, data: np.ndarray):
+    h, w = data.shape
+    with rasterio.open(
+        path, "w", driver="GTiff", height=h, width=w, count=1, dtype=data.dtype,
+        crs="EPSG:4326", transform=from_bounds(*BBOX, w, h),
+    ) as dst:
+        dst.write(data, 1)
+
+
+@pytest.fixture
+def rasters_dir(tmp_path: Path) -> Path:
+    """
+    Tiny LST / NDVI / population rasters named like the AppEEARS and WorldPop
+    downloads, so build_hex_metrics picks them up with its usual patterns.
+    """
+    d = tmp_path / "rasters"
+    d.mkdir()
+    ramp = np.linspace(0, 1, 20 * 20).reshape(20, 20)
+    # LST: Kelvin / 0.02 -> 27..37 °C
+    lst = ((300.15 + 10 * ramp) / 0.02).astype("uint16")
+    _write_tif(d / "MOD11A2.061_LST_Day_1km_doy2024089000000_aid0001.tif", lst)
+    _write_tif(d / "MOD11A2.061_LST_Day_1km_doy2024097000000_aid0001.tif", lst)
+    # NDVI: scaled by 10000 -> 0.1..0.7
+    ndvi = ((0.1 + 0.6 * ramp) * 10000).astype("int16")
+    _write_tif(d / "MOD13Q1.061__250m_16_days_NDVI_doy2024081000000_aid0001.tif", ndvi)
+    # WorldPop: persons per hectare
+    pop = (5 + 100 * ramp).astype("float32")
+    _write_tif(d / "bgd_pd_2020_1km.tif", pop)
+    return d
+
+
+def make_hex_table(rings: int = 10, seed: int = 0) -> pd.DataFrame:
+    """Random metrics on a k-ring disk of res-9 hexes around central Dhaka."""
+    rng = np.random.default_rng(seed)
+    ids = sorted(h3.k_ring(h3.geo_to_h3(23.81, 90.41, 9), rings))
+    lat, lon = zip(*(h3.h3_to_geo(h) for h in ids))
+    df = pd.DataFrame({
+        "hex_id": ids, "lat": lat, "lon": lon,
+        "ndvi_mean": rng.uniform(0.0, 0.8, len(ids)),
+        "lst_day_mean": rng.uniform(25.0, 40.0, len(ids)),
+        "pop_density": rng.uniform(0.0, 20_000.0, len(ids)),
+    })
+    df.loc[::17, "lst_day_mean"] = np.nan  # a few hexes without a reading
+    return df
+
+
+@pytest.fixture
+def hex_table(tmp_path, monkeypatch):
+    """Serve make_hex_table() from HexStore, with no facilities loaded."""
+    from app.services import facilities
+    from app.services.geo import HexStore
+
+    monkeypatch.setattr(facilities, "FACILITIES_DIR", tmp_path / "facilities")
+    facilities.FacilityStore._df = None
+    path = tmp_path / "hex.parquet"
+    make_hex_table().to_parquet(path)
+    HexStore.swap(path)
+    return HexStore.snapshot()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
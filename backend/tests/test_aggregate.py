@@ -0,0 +1,46 @@
+import pytest
+
+from app.routes.aggregate import MAX_FEATURES
+from app.services.aggregate import features_of
+
+RING = [[90.40, 23.80], [90.42, 23.80], [90.42, 23.82], [90.40, 23.82], [90.40, 23.80]]
+POLYGON = {"type": "Polygon", "coordinates": [RING]}
+
+
+@pytest.mark.parametrize("gj", [
+    {"type": "FeatureCollection", "features": [1]},
+    {"type": "FeatureCollection", "features": "xxxxxxxxxx"},
+    {"type": "FeatureCollection", "features": {"a": 1}},
+    {"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": None}]},
+    {"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": POLYGON, "properties": 3}]},
+    {"type": "Feature", "geometry": "x"},
+])
+def test_features_of_rejects_malformed(gj):
+    with pytest.raises(ValueError):
+        features_of(gj)
+
+
+@pytest.mark.parametrize("gj", [
+    {"type": "FeatureCollection", "features": [1]},
+    {"type": "FeatureCollection", "features": "xxxxxxxxxx"},
+    {"type": "Feature", "geometry": {"type": "Point", "coordinates": [90.41, 23.81]}},
+    {"type": "Polygon", "coordinates": "x"},
+])
+def test_aggregate_malformed_geojson_is_400(hex_table, client, gj):
+    assert client.post("/api/aggregate/", json={"geojson": gj}).status_code == 400
+
+
+def test_aggregate_too_many_features_is_400(hex_table, client):
+    feat = {"type": "Feature", "properties": {}, "geometry": POLYGON}
+    gj = {"type": "FeatureCollection", "features": [feat] * (MAX_FEATURES + 1)}
+    assert client.post("/api/aggregate/", json={"geojson": gj}).status_code == 400
+
+
+def test_aggregate_polygon(hex_table, client):
+    feat = {"type": "Feature", "properties": {"name": "a"}, "geometry": POLYGON}
+    r = client.post("/api/aggregate/", json={"geojson": {"type": "FeatureCollection", "features": [feat]}})
+    assert r.status_code == 200
+    item = r.json()["items"][0]
+    assert item["properties"] == {"name": "a"}
+    assert 0 < item["matched"] <= item["cells"]
+    assert item["lst_day_mean"] is not None
@@ -0,0 +1,37 @@
+import numpy as np
+
+from conftest import make_hex_table
+from app.services.facilities import FacilityStore, PARK_KINDS, nearest_facility_km
+from app.services.geo import HexStore
+
+
+def test_nearest_cache_drops_old_hex_versions(hex_table, tmp_path):
+    nearest_facility_km(PARK_KINDS)
+    for seed in range(3):
+        path = tmp_path / f"t{seed}.parquet"
+        make_hex_table(rings=4 + seed, seed=seed).to_parquet(path)
+        HexStore.swap(path)
+        dist = nearest_facility_km(PARK_KINDS)
+        assert len(dist) == len(HexStore.load())
+    assert {k[0] for k in FacilityStore._nearest} == {HexStore.version()}
+
+
+def test_nearest_for_held_snapshot(hex_table, tmp_path):
+    path = tmp_path / "small.parquet"
+    make_hex_table(rings=3).to_parquet(path)
+    HexStore.swap(path)
+    # a request that took its snapshot before the swap still gets aligned distances
+    assert len(nearest_facility_km(PARK_KINDS, hex_table)) == len(hex_table.df)
+    assert len(nearest_facility_km(PARK_KINDS)) == len(HexStore.load())
+
+
+def test_upload_parks_and_distances(hex_table, client):
+    gj = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"leisure": "park"},
+         "geometry": {"type": "Point", "coordinates": [90.41, 23.81]}},
+    ]}
+    r = client.post("/api/facilities/", json=gj)
+    assert r.status_code == 200
+    assert r.json()["counts"] == {"park": 1}
+    dist = nearest_facility_km(PARK_KINDS)
+    assert np.nanmin(dist) < 0.5
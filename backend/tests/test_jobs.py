@@ -0,0 +1,104 @@
+import queue
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import BBOX, make_hex_table
+from app.main import app
+from app.services import jobs as jobs_service
+from app.services.build import build_hex_metrics
+from app.services.geo import HexStore
+from app.services.jobs import BuildParams, Job, JobManager
+
+
+@pytest.fixture
+def job_paths(tmp_path, monkeypatch):
+    """Keep build outputs and the published parquet inside tmp_path."""
+    monkeypatch.setattr(jobs_service, "BUILDS_DIR", tmp_path / "builds")
+    monkeypatch.setattr(jobs_service, "DATA_PATH", tmp_path / "hex_features_ext.parquet")
+    yield tmp_path
+    JobManager.shutdown()
+
+
+def test_build_hex_metrics(rasters_dir, tmp_path):
+    out = tmp_path / "hex.parquet"
+    n = build_hex_metrics(out, bbox=BBOX, res=9, rasters_dir=rasters_dir)
+
+    df = pd.read_parquet(out)
+    assert n == len(df) > 0
+    assert list(df.columns) == ["hex_id", "lat", "lon", "ndvi_mean", "lst_day_mean", "pop_density"]
+    assert df["lat"].between(BBOX[1], BBOX[3]).all()
+    assert df["lon"].between(BBOX[0], BBOX[2]).all()
+    assert df["lst_day_mean"].between(26.9, 37.1).all()
+    assert df["ndvi_mean"].between(0.09, 0.71).all()
+    assert df["pop_density"].between(499, 10_501).all()  # per hectare -> per km²
+
+
+def test_build_date_filter(rasters_dir, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        build_hex_metrics(tmp_path / "hex.parquet", bbox=BBOX, res=9, rasters_dir=rasters_dir,
+                          start=date(2025, 1, 1))
+
+
+def test_build_job_swaps_hexstore(rasters_dir, job_paths, monkeypatch):
+    # serve an initial table so there is something to swap out
+    first = job_paths / "first.parquet"
+    build_hex_metrics(first, bbox=BBOX, res=8, rasters_dir=rasters_dir)
+    HexStore.swap(first)
+    before = HexStore.version()
+
+    swapped_on = []
+    swap = HexStore.swap.__func__
+
+    def recording_swap(cls, path):
+        swapped_on.append(threading.current_thread().name)
+        return swap(cls, path)
+
+    monkeypatch.setattr(HexStore, "swap", classmethod(recording_swap))
+
+    job = JobManager.submit(BuildParams(city="Dhaka", bbox=BBOX, res=9, rasters_dir=rasters_dir))
+
+    client = TestClient(app)
+    deadline = time.time() + 120
+    while True:
+        body = client.get(f"/api/jobs/{job.id}").json()
+        if body["status"] in ("done", "failed") or time.time() > deadline:
+            break
+        time.sleep(0.2)
+
+    assert body["status"] == "done", body
+    assert body["progress"] == 1.0
+    assert HexStore.version() > before
+    assert HexStore.resolution() == 9
+    assert len(HexStore.load()) == body["rows"]
+    assert jobs_service.DATA_PATH.exists()
+    assert not job.output.exists()  # build file removed once published
+    assert swapped_on == ["build-publish"]  # not on the executor's callback thread
+
+
+def test_older_build_never_replaces_newer(hex_table, job_paths, monkeypatch):
+    monkeypatch.setattr(JobManager, "_published_seq", -1)
+    jobs_service.BUILDS_DIR.mkdir()
+    newer = Job(id="newer", params=BuildParams(city="x", bbox=BBOX), seq=2)
+    older = Job(id="older", params=BuildParams(city="x", bbox=BBOX), seq=1)
+    make_hex_table(rings=4).to_parquet(newer.output)
+    make_hex_table(rings=2).to_parquet(older.output)
+
+    pending = queue.Queue()
+    for job in (newer, older, None):  # the older build finishes last
+        pending.put(job)
+    JobManager._publish_loop(pending)
+
+    assert (newer.status, newer.stage) == ("done", "done")
+    assert (older.status, older.stage) == ("done", "superseded")
+    assert len(HexStore.load()) == len(make_hex_table(rings=4))
+    assert len(pd.read_parquet(jobs_service.DATA_PATH)) == len(make_hex_table(rings=4))
+    assert not newer.output.exists() and not older.output.exists()
+
+
+def test_unknown_job_404():
+    assert TestClient(app).get("/api/jobs/nope").status_code == 404
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from h3 import h3
+
+from conftest import make_hex_table
+from app.services import neighborhood
+from app.services.geo import HexStore
+from app.services.neighborhood import adjacency, getis_ord_gi_star, smoothed
+
+
+def _brute_force(df, x, k):
+    """Gi* and k-ring mean straight from h3.k_ring, one hex at a time."""
+    pos = {hx: i for i, hx in enumerate(df["hex_id"])}
+    valid = ~np.isnan(x)
+    n, xbar, s = valid.sum(), x[valid].mean(), x[valid].std()
+    gi = np.full(len(x), np.nan)
+    mean = np.full(len(x), np.nan)
+    for i, hx in enumerate(df["hex_id"]):
+        nb = [pos[h] for h in h3.k_ring(hx, k) if h in pos and valid[pos[h]]]
+        w = len(nb)
+        if w:
+            mean[i] = x[nb].mean()
+        if valid[i] and w:
+            den = s * np.sqrt((n * w - w ** 2) / (n - 1))
+            if den > 0:
+                gi[i] = (x[nb].sum() - xbar * w) / den
+    return gi, mean
+
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+def test_gi_star_and_smoothing_match_brute_force(hex_table, k):
+    df = hex_table.df
+    x = df["lst_day_mean"].to_numpy(dtype=float)
+    gi, mean = _brute_force(df, x, k)
+    np.testing.assert_allclose(getis_ord_gi_star(x, k), gi, equal_nan=True)
+    np.testing.assert_allclose(smoothed(x, k), mean, equal_nan=True)
+    assert np.isnan(getis_ord_gi_star(x, k)[np.isnan(x)]).all()
+
+
+def test_adjacency_is_lazy_and_follows_swaps(hex_table, tmp_path):
+    path = tmp_path / "small.parquet"
+    make_hex_table(rings=4).to_parquet(path)
+    HexStore.swap(path)
+    assert not any(v == HexStore.version() for v, _ in neighborhood._adjacency)
+
+    a = adjacency(2)
+    assert a.shape == (len(HexStore.load()),) * 2
+    # the table held by an older snapshot keeps its own shape
+    assert adjacency(1, hex_table).shape == (len(hex_table.df),) * 2
+
+
+def test_hotspots_gi_theme(hex_table, client):
+    r = client.get("/api/hotspots/", params={"theme": "heat_gi", "k": 2, "limit": 5})
+    assert r.status_code == 200
+    scores = [i["score"] for i in r.json()]
+    assert len(scores) == 5 and scores == sorted(scores, reverse=True)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from conftest import make_hex_table
+from app.services.geo import HexStore
+from app.services.scenario import Cooling, ParkBaseline, ScenarioStore
+
+
+def _interventions(df, n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(df["hex_id"].to_numpy(), size=n, replace=False)
+    return [(str(h), float(d)) for h, d in zip(ids, rng.uniform(0.1, 0.6, n))]
+
+
+@pytest.mark.parametrize("limit", [1, 5, 25, 200])
+def test_top_parks_matches_full_resort(hex_table, limit):
+    s, missing = ScenarioStore.create(_interventions(hex_table.df), Cooling(rings=2))
+    assert missing == []
+
+    full = s.base.score.copy()
+    for p, sc in s.score.items():
+        full[p] = sc
+    expected = np.sort(full[~np.isnan(full)])[::-1][:limit]
+
+    top = s.top_parks(limit)
+    got = np.array([s.score.get(p, s.base.score[p]) for p in top])
+    assert len(set(top)) == len(top)
+    np.testing.assert_allclose(got, expected)  # ties may come out in another order
+
+
+def test_unknown_hexes_are_skipped(hex_table):
+    s, missing = ScenarioStore.create([("nope", 0.3), (hex_table.df["hex_id"].iloc[0], 0.3)])
+    assert missing == ["nope"]
+    assert len(s.interventions) == 1
+
+
+def test_fork_leaves_parent_untouched(hex_table):
+    first, second = _interventions(hex_table.df, 4), _interventions(hex_table.df, 4, seed=1)
+    parent, _ = ScenarioStore.create(first)
+    before = parent.summary()
+
+    child, _ = ScenarioStore.create(second, parent=parent.id)
+    assert child.id != parent.id
+    assert child.interventions == parent.interventions + second
+    assert ScenarioStore.get(parent.id).summary() == before
+
+    # a child equals one scenario built from all interventions at once
+    flat, _ = ScenarioStore.create(first + second)
+    a, b = child.summary(), flat.summary()
+    for key in ("city", "changes", "parks"):
+        assert a[key] == b[key]
+
+
+def test_replay_after_swap(hex_table, tmp_path):
+    ivs = _interventions(hex_table.df, 6)
+    s, _ = ScenarioStore.create(ivs)
+    old_key = s.base.key
+
+    path = tmp_path / "other.parquet"
+    make_hex_table(seed=3).to_parquet(path)  # same hexes, new readings
+    HexStore.swap(path)
+
+    again = ScenarioStore.get(s.id)
+    assert again.id == s.id
+    assert again.base.key != old_key
+    assert again.base is ParkBaseline.get()
+    assert again.interventions == ivs
+
+    fresh, _ = ScenarioStore.create(ivs)
+    a, b = again.summary(), fresh.summary()
+    for key in ("city", "changes", "parks"):
+        assert a[key] == b[key]
+
+
+def test_scenario_api_replays_after_shrinking_swap(hex_table, client, tmp_path):
+    ivs = _interventions(hex_table.df, 6)
+    body = {"interventions": [{"hex_id": h, "ndvi_delta": d} for h, d in ivs]}
+    sid = client.post("/api/scenarios/", json=body).json()["id"]
+
+    path = tmp_path / "small.parquet"
+    make_hex_table(rings=3).to_parquet(path)
+    HexStore.swap(path)
+
+    r = client.get(f"/api/scenarios/{sid}")
+    assert r.status_code == 200
+    assert r.json()["interventions"] <= len(ivs)  # hexes outside the new table are dropped
+    assert client.delete(f"/api/scenarios/{sid}").status_code == 200
+    assert client.get(f"/api/scenarios/{sid}").status_code == 404
@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+
+from conftest import make_hex_table
+from app.services.geo import HexStore
+from app.services.scoring import ScoreCache, compile_expression, weights_to_expression
+
+
+@pytest.mark.parametrize("weights", [
+    {"heat*0+ndvi": 1},
+    {"heat + ndvi": 1},
+    {"lambda": 1},
+    {"": 1},
+    {"heat": float("inf")},
+])
+def test_weights_reject_non_column_keys(weights):
+    with pytest.raises(ValueError):
+        weights_to_expression(weights)
+
+
+def test_weights_to_expression_is_name_sorted():
+    assert weights_to_expression({"pop": 1, "heat": 2}) == "2.0 * heat + 1.0 * pop"
+
+
+def test_score_weights_with_expression_key_is_400(hex_table, client):
+    r = client.post("/api/score/", json={"weights": {"heat*0+ndvi": 1}})
+    assert r.status_code == 400
+
+
+def test_score_weights_unknown_column_is_400(hex_table, client):
+    r = client.post("/api/score/", json={"weights": {"nope": 1}})
+    assert r.status_code == 400
+    assert "Unknown column 'nope'" in r.json()["detail"]
+
+
+# ------------------ compile_expression ------------------
+
+NAMES = {"heat", "ndvi", "pop"}
+COLS = {
+    "heat": np.array([1.0, 2.0, np.nan]),
+    "ndvi": np.array([0.5, 0.0, 1.0]),
+    "pop": np.array([0.0, 1.0, 2.0]),
+}
+
+
+@pytest.mark.parametrize("expr", [
+    "__import__('os').system('true')",
+    "heat.__class__",
+    "heat.real",
+    "heat[0]",
+    "heat if ndvi else pop",
+    "heat > ndvi",
+    "heat and ndvi",
+    "lambda: heat",
+    "[heat]",
+    "'heat'",
+    "True + heat",
+    "heat // 2",
+    "heat % 2",
+    "open('x')",
+    "clip(heat, a_min=0, a_max=1)",
+    "(heat := 1)",
+    "heat;",
+    "",
+])
+def test_compile_rejects_syntax(expr):
+    with pytest.raises(ValueError):
+        compile_expression(expr, NAMES)
+
+
+@pytest.mark.parametrize("expr", ["min(heat)", "sqrt(heat, ndvi)", "clip(heat, 0)"])
+def test_compile_checks_function_arity(expr):
+    with pytest.raises(ValueError, match="argument"):
+        compile_expression(expr, NAMES)
+
+
+def test_compile_unknown_and_unavailable_columns():
+    with pytest.raises(ValueError, match="Unknown column 'wind'"):
+        compile_expression("heat + wind", NAMES)
+    with pytest.raises(ValueError, match="unavailable: no parks"):
+        compile_expression("raw_park_km", NAMES, {"raw_park_km": "no parks"})
+
+
+def test_compile_evaluates_and_canonicalises():
+    fn, canon = compile_expression("  2*heat -   -ndvi + max(pop, 1) ** 2 ", NAMES)
+    assert canon == "2 * heat - -ndvi + max(pop, 1) ** 2"
+    out = fn(COLS)
+    np.testing.assert_allclose(out[:2], [2 + 0.5 + 1, 4 + 0 + 1])
+    assert np.isnan(out[2])  # NaN inputs stay NaN
+
+
+# ------------------ ScoreCache / /api/score ------------------
+
+def test_score_turns_inf_into_nan(hex_table):
+    scores, df = ScoreCache.score("1 / (raw_pop - raw_pop)")
+    assert len(scores) == len(df)
+    assert np.isnan(scores).all()
+
+
+def test_score_is_memoised_per_canonical_expression(hex_table):
+    a, df = ScoreCache.score("heat+2*ndvi")
+    b, _ = ScoreCache.score(" heat + 2 * ndvi ")
+    assert a is b
+    assert df is hex_table.df
+    assert not a.flags.writeable
+
+
+def test_score_cache_resets_on_swap(hex_table, tmp_path):
+    a, _ = ScoreCache.score("heat")
+    path = tmp_path / "other.parquet"
+    make_hex_table(rings=5, seed=1).to_parquet(path)
+    HexStore.swap(path)
+    b, df = ScoreCache.score("heat")
+    assert b is not a
+    assert len(b) == len(df) == len(HexStore.load())
+
+
+def test_score_api_top_and_column(hex_table, client):
+    r = client.post("/api/score/", json={"expression": "heat - ndvi", "limit": 5})
+    assert r.status_code == 200
+    items = r.json()["items"]
+    assert len(items) == 5
+    assert [i["score"] for i in items] == sorted((i["score"] for i in items), reverse=True)
+
+    r = client.post("/api/score/", json={"expression": "raw_heat", "mode": "column"})
+    body = r.json()
+    assert len(body["score"]) == len(hex_table.df)
+    assert None in body["score"]  # hexes without an LST reading
+
+
+@pytest.mark.parametrize("payload, detail", [
+    ({"expression": "__import__('os')"}, "Unsupported syntax"),
+    ({"expression": "heat.real"}, "Unsupported syntax"),
+    ({"expression": "wind"}, "Unknown column"),
+    ({"expression": "raw_park_km"}, "unavailable"),
+    ({"expression": "heat", "weights": {"heat": 1}}, "not both"),
+    ({}, "Give an 'expression' or 'weights'"),
+])
+def test_score_api_rejects(hex_table, client, payload, detail):
+    r = client.post("/api/score/", json=payload)
+    assert r.status_code == 400
+    assert detail in r.json()["detail"]
+
+
+def test_score_api_weights(hex_table, client):
+    r = client.post("/api/score/", json={"weights": {"pop": 1, "heat": 2}, "limit": 3})
+    assert r.status_code == 200
+    assert r.json()["expression"] == "2.0 * heat + 1.0 * pop"